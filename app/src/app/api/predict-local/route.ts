@@ -23,6 +23,9 @@ interface PredictionResult {
 
 type ModelType = "logistic" | "mlp";
 
+// Optional long-lived Python worker (`predict_local.py --serve`); falls back to one process per request
+const PREDICT_WORKER_URL = process.env.PREDICT_WORKER_URL;
+
 export async function GET(request: NextRequest) {
   const searchParams = request.nextUrl.searchParams;
   const lat = parseFloat(searchParams.get("lat") || "");
@@ -47,6 +50,28 @@ export async function GET(request: NextRequest) {
     );
   }
 
+  if (PREDICT_WORKER_URL) {
+    try {
+      const params = new URLSearchParams({
+        lat: lat.toString(),
+        lon: lon.toString(),
+        speciesKey: speciesKey.toString(),
+        gridSize: gridSize.toString(),
+        modelType,
+        mcSamples: mcSamples.toString(),
+      });
+      const response = await fetch(`${PREDICT_WORKER_URL}/predict?${params}`);
+      const data = await response.json();
+      return NextResponse.json(data, { status: response.status });
+    } catch (error) {
+      console.error("Prediction worker error:", error);
+      return NextResponse.json(
+        { error: error instanceof Error ? error.message : "Prediction failed" },
+        { status: 502 }
+      );
+    }
+  }
+
   // Call the Python script to get predictions
   const projectRoot = path.join(process.cwd(), "..");
   const scriptPath = path.join(projectRoot, "predict_local.py");
@@ -8,30 +8,44 @@ Runs multiple trials per n value to reduce variance from random sampling.
 Supports two model types:
 - logistic: Logistic Regression (fast, simple)
 - mlp: MLP with MC Dropout (provides uncertainty estimates)
+
+Trials are independent and seeded, so they can run on a process pool
+(--workers N) that shares one read-only mosaic; torch and BLAS run on one
+thread in both modes, so output is identical to a serial run.
 """
 
 import argparse
 import json
 import logging
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Literal, Tuple
+from typing import Iterator, Literal, Optional, Tuple
 
 import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
 
 import torch
 import torch.nn as nn
 from torch.utils.data import DataLoader, TensorDataset
 
-from finder import get_species_info, fetch_occurrences, EmbeddingMosaic
-from finder.pipeline import REGIONS
+from finder import get_species_info, resolve_species, fetch_occurrences, EmbeddingMosaic
+from finder.embeddings import SharedMosaic
+from finder.store import NameCache, OccurrenceStore
+from finder.pipeline import REGIONS, sample_background_pixels
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
 
 PROJECT_ROOT = Path(__file__).parent
 CACHE_DIR = PROJECT_ROOT / "cache"
+GBIF_DB = CACHE_DIR / "gbif.sqlite"
+OCCURRENCE_STORE = OccurrenceStore(GBIF_DB)
+NAME_CACHE = NameCache(GBIF_DB)
 OUTPUT_DIR = PROJECT_ROOT / "output" / "experiments"
 
 # Experiment parameters
@@ -47,6 +61,9 @@ BASE_SEED = 42
 
 ModelType = Literal["logistic", "mlp"]
 
+# Species name -> (occurrence embeddings, their coordinates)
+SpeciesOccurrences = dict[str, tuple[np.ndarray, list[tuple[float, float]]]]
+
 
 class MLPClassifier(nn.Module):
     """Simple MLP with dropout for experiments."""
@@ -166,40 +183,60 @@ def sample_background_points(
     rng: np.random.Generator,
 ) -> tuple[np.ndarray, list[tuple[float, float]]]:
     """Sample random background points."""
-    h, w, _ = mosaic.shape
+    rows, cols = sample_background_pixels(mosaic, n_points, exclude_coords, rng)
+    lons, lats = mosaic.pixels_to_coords(rows, cols)
+    return mosaic.mosaic[rows, cols], list(zip(lons.tolist(), lats.tolist()))
+
+
+def _average_ranks(values: np.ndarray) -> np.ndarray:
+    """1-based ranks along the last axis of a 2D array; tied values share their average rank."""
+    n_rows, n = values.shape
+    order = np.argsort(values, axis=1, kind="stable")
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    positions = np.broadcast_to(np.arange(n), (n_rows, n))
+
+    # Tie groups start where the sorted value changes and end just before the next start
+    starts = np.ones((n_rows, n), dtype=bool)
+    starts[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    ends = np.ones((n_rows, n), dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends, positions, n - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    ranks = np.empty((n_rows, n), dtype=np.float64)
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=1)
+    return ranks
 
-    exclude_pixels = set()
-    for lon, lat in exclude_coords:
-        row, col = mosaic.coords_to_pixel(lon, lat)
-        exclude_pixels.add((row, col))
 
-    coords = []
-    embeddings = []
-    attempts = 0
-    max_attempts = n_points * 10
+def compute_auc_batched(pos_scores: np.ndarray, neg_scores: np.ndarray) -> np.ndarray:
+    """
+    Rank-based (Mann-Whitney U) AUC for several trials at once.
 
-    while len(coords) < n_points and attempts < max_attempts:
-        row = rng.integers(0, h)
-        col = rng.integers(0, w)
-        if (row, col) not in exclude_pixels:
-            lon, lat = mosaic.pixel_to_coords(row, col)
-            emb = mosaic.mosaic[row, col, :]
-            if not np.allclose(emb, 0):
-                coords.append((lon, lat))
-                embeddings.append(emb)
-                exclude_pixels.add((row, col))
-        attempts += 1
+    Args:
+        pos_scores: Positive scores, shape (n_trials, n_pos)
+        neg_scores: Negative scores, shape (n_trials, n_neg)
 
-    return np.array(embeddings), coords
+    Returns:
+        AUC per trial, shape (n_trials,). Ties count as half a correct pair.
+    """
+    pos_scores = np.asarray(pos_scores, dtype=np.float64)
+    neg_scores = np.asarray(neg_scores, dtype=np.float64)
+    n_trials, n_pos = pos_scores.shape
+    n_neg = neg_scores.shape[1]
+    if n_pos == 0 or n_neg == 0:
+        return np.full(n_trials, 0.5)
+
+    ranks = _average_ranks(np.concatenate([pos_scores, neg_scores], axis=1))
+    u = ranks[:, :n_pos].sum(axis=1) - n_pos * (n_pos + 1) / 2
+    return u / (n_pos * n_neg)
 
 
 def compute_auc(pos_scores: np.ndarray, neg_scores: np.ndarray) -> float:
-    """AUC: P(random positive > random negative)."""
-    n_comparisons = len(pos_scores) * len(neg_scores)
-    if n_comparisons == 0:
-        return 0.5
-    n_correct = sum((p > n) for p in pos_scores for n in neg_scores)
-    return n_correct / n_comparisons
+    """AUC: P(random positive > random negative), ties counted as half."""
+    pos_scores = np.asarray(pos_scores).reshape(1, -1)
+    neg_scores = np.asarray(neg_scores).reshape(1, -1)
+    return float(compute_auc_batched(pos_scores, neg_scores)[0])
 
 
 def compute_classification_metrics(
@@ -241,8 +278,14 @@ def run_single_trial(
     mosaic: EmbeddingMosaic,
     rng: np.random.Generator,
     model_type: ModelType = "logistic",
-) -> dict:
-    """Run a single trial for a given n_positive value."""
+) -> tuple[dict, np.ndarray, np.ndarray]:
+    """
+    Run a single trial for a given n_positive value.
+
+    Returns:
+        Tuple of (trial result without AUC, positive test scores, negative
+        test scores). AUC is computed by the caller for all trials at once.
+    """
     n_total = len(valid_coords)
 
     # Shuffle occurrences for this trial
@@ -272,6 +315,8 @@ def run_single_trial(
 
     # Train classifier and score based on model type
     if model_type == "mlp":
+        # Seed torch from the trial's generator so MLP trials are reproducible
+        torch.manual_seed(int(rng.integers(2**63)))
         all_scores, all_uncertainties = compute_classifier_mlp(
             train_emb, train_neg_emb, test_all_emb
         )
@@ -290,11 +335,9 @@ def run_single_trial(
         neg_uncertainties = all_uncertainties[len(test_pos_emb):]
 
     # Compute metrics
-    auc = compute_auc(pos_scores, neg_scores)
     metrics = compute_classification_metrics(pos_scores, neg_scores, threshold=0.5)
 
     result = {
-        "auc": auc,
         "precision": metrics["precision"],
         "recall": metrics["recall"],
         "f1": metrics["f1"],
@@ -325,25 +368,131 @@ def run_single_trial(
         for i, pt in enumerate(result["test_negative"]):
             pt["uncertainty"] = float(neg_uncertainties[i])
 
-    return result
+    return result, pos_scores, neg_scores
+
+
+def run_seeded_trial(
+    mosaic: EmbeddingMosaic,
+    n_pos: int,
+    all_occ_emb: np.ndarray,
+    valid_coords: list[tuple[float, float]],
+    trial_seed: int,
+    model_type: ModelType,
+) -> tuple[dict, np.ndarray, np.ndarray]:
+    """Run one trial with its own seeded generator."""
+    rng = np.random.default_rng(trial_seed)
+    trial_result, pos_scores, neg_scores = run_single_trial(
+        n_pos, all_occ_emb, valid_coords, mosaic, rng, model_type=model_type
+    )
+    trial_result["seed"] = trial_seed
+    return trial_result, pos_scores, neg_scores
+
+
+# Mosaic and occurrences attached once per worker process by _init_worker
+_worker_mosaic: Optional[EmbeddingMosaic] = None
+_worker_occurrences: SpeciesOccurrences = {}
+
+
+def _init_worker(shared: SharedMosaic, occurrences: dict[str, tuple[Path, Path]]) -> None:
+    """Process pool initializer: map the shared mosaic and occurrences, and use one torch/BLAS thread."""
+    global _worker_mosaic, _worker_occurrences
+    _worker_mosaic = EmbeddingMosaic.attach(shared)
+    _worker_occurrences = {
+        species: (np.load(emb_path, mmap_mode="r"), [tuple(c) for c in np.load(coords_path).tolist()])
+        for species, (emb_path, coords_path) in occurrences.items()
+    }
+    torch.set_num_threads(1)
+    threadpool_limits(limits=1)
+
+
+def _run_trial_in_worker(
+    species_name: str,
+    n_pos: int,
+    trial_seed: int,
+    model_type: ModelType,
+) -> tuple[dict, np.ndarray, np.ndarray]:
+    all_occ_emb, valid_coords = _worker_occurrences[species_name]
+    return run_seeded_trial(
+        _worker_mosaic, n_pos, all_occ_emb, valid_coords, trial_seed, model_type
+    )
+
+
+@contextmanager
+def _single_threaded() -> Iterator[None]:
+    """Run torch and BLAS on one thread, as in pool workers, so results do not depend on the mode."""
+    n_threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    try:
+        with threadpool_limits(limits=1):
+            yield
+    finally:
+        torch.set_num_threads(n_threads)
+
+
+@contextmanager
+def trial_executor(
+    mosaic: EmbeddingMosaic,
+    workers: int,
+    occurrences: SpeciesOccurrences,
+) -> Iterator[Optional[Executor]]:
+    """Process pool sharing a read-only mosaic and occurrences, or None to run trials serially."""
+    if workers <= 1:
+        with _single_threaded():
+            yield None
+        return
+
+    # Workers map the mosaic and occurrences from a tmpfs-backed directory
+    # instead of receiving pickled copies
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.TemporaryDirectory(dir=shm_dir) as shared_dir:
+        shared_dir = Path(shared_dir)
+        shared = mosaic.share(shared_dir)
+        shared_occurrences = {}
+        for i, (species, (all_occ_emb, valid_coords)) in enumerate(occurrences.items()):
+            emb_path, coords_path = shared_dir / f"occ_emb_{i}.npy", shared_dir / f"occ_coords_{i}.npy"
+            np.save(emb_path, all_occ_emb)
+            np.save(coords_path, np.asarray(valid_coords, dtype=np.float64).reshape(-1, 2))
+            shared_occurrences[species] = (emb_path, coords_path)
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(shared, shared_occurrences)
+        ) as executor:
+            logger.info(f"Running trials on {workers} worker processes")
+            yield executor
+
+
+def sample_species_occurrences(
+    species_name: str,
+    mosaic: EmbeddingMosaic,
+) -> tuple[np.ndarray, list[tuple[float, float]]]:
+    """Fetch a species' occurrences in the region and their embeddings."""
+    bbox = REGIONS[REGION]["bbox"]
+    species_info = get_species_info(species_name, NAME_CACHE)
+    occurrences = fetch_occurrences(species_info["taxon_key"], bbox, store=OCCURRENCE_STORE)
+    logger.info(f"{species_name}: {len(occurrences)} occurrences")
+    return mosaic.sample_at_coords(occurrences)
 
 
 def run_species_experiment(
     species_name: str,
     mosaic: EmbeddingMosaic,
+    all_occ_emb: np.ndarray,
+    valid_coords: list[tuple[float, float]],
     model_type: ModelType = "logistic",
+    executor: Optional[Executor] = None,
 ):
-    """Run experiment for a single species with multiple trials per n."""
+    """
+    Run experiment for a single species with multiple trials per n.
+
+    If executor is given (see trial_executor), trials run on it in parallel
+    against the occurrences it was created with; results are collected in
+    submission order.
+    """
     logger.info(f"\n{'='*60}")
     logger.info(f"Species: {species_name} (model: {model_type})")
     logger.info("=" * 60)
 
-    bbox = REGIONS[REGION]["bbox"]
-    species_info = get_species_info(species_name)
-    occurrences = fetch_occurrences(species_info["taxon_key"], bbox)
-    logger.info(f"Total occurrences: {len(occurrences)}")
-
-    all_occ_emb, valid_coords = mosaic.sample_at_coords(occurrences)
+    species_info = get_species_info(species_name, NAME_CACHE)
     n_total = len(valid_coords)
     logger.info(f"Valid with embeddings: {n_total}")
 
@@ -353,32 +502,46 @@ def run_species_experiment(
 
     experiments = []
 
-    for n_pos in N_POSITIVE_VALUES:
-        if n_pos >= n_total - 10:  # Need at least 10 test samples
-            continue
-
+    # Need at least 10 test samples
+    n_values = [n_pos for n_pos in N_POSITIVE_VALUES if n_pos < n_total - 10]
+    # Different seed for each trial
+    tasks = [
+        (n_pos, BASE_SEED + trial_idx)
+        for n_pos in n_values
+        for trial_idx in range(N_TRIALS)
+    ]
+
+    if executor is None:
+        outcomes = [
+            run_seeded_trial(mosaic, n_pos, all_occ_emb, valid_coords, seed, model_type)
+            for n_pos, seed in tasks
+        ]
+    else:
+        # Submit every trial up front so the pool stays busy across n values
+        futures = [
+            executor.submit(_run_trial_in_worker, species_name, n_pos, seed, model_type)
+            for n_pos, seed in tasks
+        ]
+        outcomes = [future.result() for future in futures]
+
+    for i, n_pos in enumerate(n_values):
         logger.info(f"\nn_positive = {n_pos} (+ {n_pos} negative = {n_pos * 2} total training)")
 
-        trials = []
-        aucs = []
-        f1s = []
-        precisions = []
-        recalls = []
+        n_value_outcomes = outcomes[i * N_TRIALS:(i + 1) * N_TRIALS]
+        trials = [trial for trial, _, _ in n_value_outcomes]
+        pos_scores = [pos for _, pos, _ in n_value_outcomes]
+        neg_scores = [neg for _, _, neg in n_value_outcomes]
 
-        for trial_idx in range(N_TRIALS):
-            # Different seed for each trial
-            trial_seed = BASE_SEED + trial_idx
-            rng = np.random.default_rng(trial_seed)
+        # Score AUC for all trials at once when they share test set sizes
+        if len({len(s) for s in pos_scores}) == 1 and len({len(s) for s in neg_scores}) == 1:
+            aucs = compute_auc_batched(np.stack(pos_scores), np.stack(neg_scores)).tolist()
+        else:
+            aucs = [compute_auc(p, n) for p, n in zip(pos_scores, neg_scores)]
+        trials = [{"auc": auc, **trial} for auc, trial in zip(aucs, trials)]
 
-            trial_result = run_single_trial(
-                n_pos, all_occ_emb, valid_coords, mosaic, rng, model_type=model_type
-            )
-            trial_result["seed"] = trial_seed
-            trials.append(trial_result)
-            aucs.append(trial_result["auc"])
-            f1s.append(trial_result["f1"])
-            precisions.append(trial_result["precision"])
-            recalls.append(trial_result["recall"])
+        f1s = [t["f1"] for t in trials]
+        precisions = [t["precision"] for t in trials]
+        recalls = [t["recall"] for t in trials]
 
         auc_mean = float(np.mean(aucs))
         auc_std = float(np.std(aucs))
@@ -420,8 +583,14 @@ def run_species_experiment(
     }
 
 
-def run_all_experiments(model_type: ModelType = "logistic"):
-    """Run experiments for all species."""
+def run_all_experiments(model_type: ModelType = "logistic", workers: int = 1):
+    """
+    Run experiments for all species.
+
+    Args:
+        model_type: Classifier to evaluate
+        workers: Number of worker processes for trials (1 = run serially)
+    """
     logger.info("=" * 60)
     logger.info(f"Classifier Validation Experiment (model: {model_type})")
     logger.info(f"({N_TRIALS} trials per n value)")
@@ -449,37 +618,47 @@ def run_all_experiments(model_type: ModelType = "logistic"):
         "species": [],
     }
 
-    for species in SPECIES_LIST:
-        result = run_species_experiment(species, mosaic, model_type=model_type)
-
-        if result:
-            # Save per-species (full data with coordinates)
-            slug = species.lower().replace(" ", "_")
-            output_path = output_dir / f"{slug}.json"
-            with open(output_path, "w") as f:
-                json.dump(result, f, indent=2)
-            logger.info(f"\nSaved: {output_path}")
-
-            # Add to summary (just metrics, no coordinates)
-            species_summary = {
-                "species": species,
-                "n_occurrences": result["n_occurrences"],
-                "results": [
-                    {
-                        "n_positive": exp["n_positive"],
-                        "auc_mean": exp["auc_mean"],
-                        "auc_std": exp["auc_std"],
-                        "f1_mean": exp["f1_mean"],
-                        "f1_std": exp["f1_std"],
-                        "precision_mean": exp["precision_mean"],
-                        "precision_std": exp["precision_std"],
-                        "recall_mean": exp["recall_mean"],
-                        "recall_std": exp["recall_std"],
-                    }
-                    for exp in result["experiments"]
-                ],
-            }
-            summary["species"].append(species_summary)
+    # Resolve all names up front; misses are looked up concurrently
+    resolve_species(SPECIES_LIST, NAME_CACHE)
+
+    # Sampled before the pool starts so workers receive them once
+    logger.info("\nFetching occurrences...")
+    occurrences = {species: sample_species_occurrences(species, mosaic) for species in SPECIES_LIST}
+
+    with trial_executor(mosaic, workers, occurrences) as executor:
+        for species in SPECIES_LIST:
+            result = run_species_experiment(
+                species, mosaic, *occurrences[species], model_type=model_type, executor=executor
+            )
+
+            if result:
+                # Save per-species (full data with coordinates)
+                slug = species.lower().replace(" ", "_")
+                output_path = output_dir / f"{slug}.json"
+                with open(output_path, "w") as f:
+                    json.dump(result, f, indent=2)
+                logger.info(f"\nSaved: {output_path}")
+
+                # Add to summary (just metrics, no coordinates)
+                species_summary = {
+                    "species": species,
+                    "n_occurrences": result["n_occurrences"],
+                    "results": [
+                        {
+                            "n_positive": exp["n_positive"],
+                            "auc_mean": exp["auc_mean"],
+                            "auc_std": exp["auc_std"],
+                            "f1_mean": exp["f1_mean"],
+                            "f1_std": exp["f1_std"],
+                            "precision_mean": exp["precision_mean"],
+                            "precision_std": exp["precision_std"],
+                            "recall_mean": exp["recall_mean"],
+                            "recall_std": exp["recall_std"],
+                        }
+                        for exp in result["experiments"]
+                    ],
+                }
+                summary["species"].append(species_summary)
 
     # Save summary
     summary_path = output_dir / "summary.json"
@@ -518,13 +697,19 @@ def main():
         default="both",
         help="Model type to evaluate: logistic, mlp, or both (default: both)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for running trials in parallel (default: 1, serial)",
+    )
     args = parser.parse_args()
 
     if args.model_type == "both":
-        run_all_experiments(model_type="logistic")
-        run_all_experiments(model_type="mlp")
+        run_all_experiments(model_type="logistic", workers=args.workers)
+        run_all_experiments(model_type="mlp", workers=args.workers)
     else:
-        run_all_experiments(model_type=args.model_type)
+        run_all_experiments(model_type=args.model_type, workers=args.workers)
 
 
 if __name__ == "__main__":
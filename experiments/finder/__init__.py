@@ -4,7 +4,7 @@ Species Candidate Location Finder
 Find candidate locations for plant species using geospatial embeddings.
 """
 
-from .gbif import get_species_key, get_species_info, fetch_occurrences
+from .gbif import get_species_key, get_species_info, resolve_species, fetch_occurrences
 from .embeddings import EmbeddingMosaic
 from .methods import ClassifierMethod
 from .pipeline import find_candidates
@@ -12,6 +12,7 @@ from .pipeline import find_candidates
 __all__ = [
     "get_species_key",
     "get_species_info",
+    "resolve_species",
     "fetch_occurrences",
     "EmbeddingMosaic",
     "ClassifierMethod",
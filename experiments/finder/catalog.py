@@ -0,0 +1,198 @@
+"""
+Tile catalog: one index file describing the embedding tiles of a year.
+
+Without a catalog, finding the tiles for a bbox means building every
+candidate file name and stat-ing it. The catalog records each tile's
+position, shape, dtypes and the byte offsets of its .npy payloads, so a
+bbox lookup is a grid query on one file and each tile is opened exactly,
+without parsing .npy headers.
+
+Build it once per year directory (and again after downloading tiles) with
+scan_tiles.py.
+"""
+
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATALOG_NAME = "catalog.json"
+CATALOG_VERSION = 1
+
+_TILE_DIR_PATTERN = re.compile(r"^grid_(-?\d+\.\d+)_(-?\d+\.\d+)$")
+
+
+def tile_name(lon: float, lat: float) -> str:
+    """Directory and file stem of the tile keyed (lon, lat)."""
+    return f"grid_{lon:.2f}_{lat:.2f}"
+
+
+def tile_keys(bbox: tuple[float, float, float, float], tile_size: float) -> list[tuple[float, float]]:
+    """(lon, lat) keys of the tiles that may cover bbox, as named on disk."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    step = tile_size
+    # Tiles are named by their center, offset by half step
+    half_step = step / 2
+
+    tile_lons = np.arange(
+        np.floor((min_lon + half_step) / step) * step - half_step,
+        max_lon + step,
+        step
+    )
+    tile_lats = np.arange(
+        np.floor((min_lat + half_step) / step) * step - half_step,
+        max_lat + step,
+        step
+    )
+    return [(round(tlon, 2), round(tlat, 2)) for tlon in tile_lons for tlat in tile_lats]
+
+
+def _npy_layout(path: Path) -> tuple[tuple[int, ...], str, int]:
+    """Shape, dtype and data offset of a C-ordered .npy file, from its header."""
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        else:
+            raise ValueError(f"Unsupported .npy version {version}: {path}")
+        if fortran_order:
+            raise ValueError(f"Fortran-ordered tile not supported: {path}")
+        return shape, dtype.str, f.tell()
+
+
+@dataclass
+class TileEntry:
+    """Location and layout of one tile's data and scales arrays."""
+
+    lon: float
+    lat: float
+    shape: tuple[int, int, int]
+    dtype: str
+    data: str  # path relative to the catalog's directory
+    data_offset: int
+    scales_dtype: str
+    scales: str
+    scales_offset: int
+
+    @property
+    def n_channels(self) -> int:
+        return self.shape[2]
+
+
+class TileCatalog:
+    """
+    Index of the tiles in one year directory, keyed by (lon, lat) as named on disk.
+    """
+
+    def __init__(self, tile_dir: Path, tile_size: float, entries: list[TileEntry]):
+        self.tile_dir = Path(tile_dir)
+        self.tile_size = tile_size
+        self._entries = {(entry.lon, entry.lat): entry for entry in entries}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def scan(cls, tile_dir: Path, tile_size: float = 0.1) -> "TileCatalog":
+        """Index every complete grid_* tile under tile_dir (one .npy header read per file)."""
+        tile_dir = Path(tile_dir)
+        entries = []
+        for path in sorted(tile_dir.iterdir()):
+            match = _TILE_DIR_PATTERN.match(path.name)
+            if not match or not path.is_dir():
+                continue
+            npy_path = path / f"{path.name}.npy"
+            scales_path = path / f"{path.name}_scales.npy"
+            if not npy_path.exists() or not scales_path.exists():
+                logger.warning(f"Skipping incomplete tile: {path}")
+                continue
+
+            shape, dtype, data_offset = _npy_layout(npy_path)
+            scales_shape, scales_dtype, scales_offset = _npy_layout(scales_path)
+            if len(shape) != 3 or scales_shape != shape[:2]:
+                logger.warning(f"Skipping tile with unexpected shape {shape} / {scales_shape}: {path}")
+                continue
+
+            entries.append(TileEntry(
+                lon=float(match.group(1)),
+                lat=float(match.group(2)),
+                shape=shape,
+                dtype=dtype,
+                data=str(npy_path.relative_to(tile_dir)),
+                data_offset=data_offset,
+                scales_dtype=scales_dtype,
+                scales=str(scales_path.relative_to(tile_dir)),
+                scales_offset=scales_offset,
+            ))
+        return cls(tile_dir, tile_size, entries)
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Write the catalog (default: catalog.json in the tile directory)."""
+        path = Path(path) if path else self.tile_dir / CATALOG_NAME
+        with open(path, "w") as f:
+            json.dump({
+                "version": CATALOG_VERSION,
+                "tile_size": self.tile_size,
+                "tiles": [asdict(entry) for entry in self._entries.values()],
+            }, f)
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "TileCatalog":
+        path = Path(path)
+        with open(path) as f:
+            catalog = json.load(f)
+        if catalog.get("version") != CATALOG_VERSION:
+            raise ValueError(f"Unsupported tile catalog version {catalog.get('version')}: {path}")
+        entries = [
+            TileEntry(**{**entry, "shape": tuple(entry["shape"])})
+            for entry in catalog["tiles"]
+        ]
+        return cls(path.parent, catalog["tile_size"], entries)
+
+    @classmethod
+    def find(cls, tile_dir: Path, tile_size: float) -> Optional["TileCatalog"]:
+        """The catalog of tile_dir, or None if there is none for this tile size."""
+        path = Path(tile_dir) / CATALOG_NAME
+        if not path.exists():
+            return None
+        catalog = cls.load(path)
+        if not np.isclose(catalog.tile_size, tile_size):
+            logger.warning(f"Ignoring {path}: built for {catalog.tile_size}° tiles, not {tile_size}°")
+            return None
+        return catalog
+
+    def entries(self) -> list[TileEntry]:
+        return list(self._entries.values())
+
+    def get(self, lon: float, lat: float) -> Optional[TileEntry]:
+        """Entry of the tile keyed (lon, lat), or None if it is not present."""
+        return self._entries.get((round(lon, 2), round(lat, 2)))
+
+    def query(self, bbox: tuple[float, float, float, float]) -> dict[tuple[float, float], TileEntry]:
+        """Present tiles that may cover bbox, keyed (lon, lat)."""
+        return {
+            key: self._entries[key]
+            for key in tile_keys(bbox, self.tile_size)
+            if key in self._entries
+        }
+
+    def open(self, entry: TileEntry) -> tuple[np.memmap, np.memmap]:
+        """Memory-map a tile's (H, W, C) data and (H, W) scales at their recorded offsets."""
+        data = np.memmap(
+            self.tile_dir / entry.data, dtype=np.dtype(entry.dtype), mode="r",
+            offset=entry.data_offset, shape=entry.shape,
+        )
+        scales = np.memmap(
+            self.tile_dir / entry.scales, dtype=np.dtype(entry.scales_dtype), mode="r",
+            offset=entry.scales_offset, shape=entry.shape[:2],
+        )
+        return data, scales
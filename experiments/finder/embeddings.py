@@ -2,12 +2,79 @@
 Tessera embedding mosaic loading and sampling.
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import groupby
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Literal, Optional, Union
 
 import numpy as np
 import rasterio
 from rasterio.transform import Affine
+from rasterio.windows import Window
+
+from .catalog import TileCatalog, tile_keys, tile_name
+from .tilestore import TileStore
+
+# How the loaded mosaic is held in memory:
+# - dense: stitched float32 array over the bbox's whole tile rectangle, with
+#   missing tiles zero-filled (fastest access, 4x the quantized size)
+# - quantized: int8 values and scales of the present tiles only, held in
+#   memory and dequantized per read
+# - mmap: memory-mapped int8 tiles of the present tiles, dequantized only
+#   where read
+# Only dense memory grows with the bbox rather than the covered area; the
+# (H, W) valid-pixel mask spans the whole rectangle in every mode.
+Storage = Literal["dense", "quantized", "mmap"]
+
+# Threads decoding tiles in EmbeddingMosaic.load
+LOAD_WORKERS = min(8, os.cpu_count() or 1)
+
+# Pixels examined at a time when scanning the mosaic for nodata (the
+# comparison temporary is this times the channel count, 4 MB at 128)
+_SCAN_BLOCK_PIXELS = 1 << 15
+
+# Loaded array state that share() hands to other processes
+_SHARED_ARRAYS = ("_mosaic", "_valid_mask", "_valid_indices")
+
+
+def _quantized_valid_mask(data: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """(H, W) mask of pixels whose dequantized embedding is not all zero."""
+    h, w = data.shape[:2]
+    mask = np.empty((h, w), dtype=bool)
+    block_rows = max(1, _SCAN_BLOCK_PIXELS // w)
+    for row0 in range(0, h, block_rows):
+        row1 = min(row0 + block_rows, h)
+        np.any(data[row0:row1] != 0, axis=-1, out=mask[row0:row1])
+    mask &= scales != 0
+    return mask
+
+
+@dataclass
+class SharedMosaic:
+    """
+    Picklable handle to a loaded mosaic whose arrays live in memory-mappable files.
+
+    Created by EmbeddingMosaic.share() and opened in other processes with
+    EmbeddingMosaic.attach(); every process maps the same pages.
+    """
+
+    cache_dir: Path
+    bbox: tuple[float, float, float, float]
+    year: int
+    tile_size: float
+    storage: str
+    shape: tuple[int, int, int]
+    tile_shape: tuple[int, int]
+    transform: tuple[float, ...]
+    tile_coords: list[tuple[float, float]]
+    tile_slots: dict[tuple[int, int], tuple[int, int]]
+    arrays: dict[str, Path] = field(default_factory=dict)
+    tiles: dict[tuple[int, int], tuple[Path, Path]] = field(default_factory=dict)
+    # Memory-mapped tiles read from a consolidated tile store: slot -> chunk id
+    store: Optional[Path] = None
+    chunks: dict[tuple[int, int], int] = field(default_factory=dict)
 
 
 class EmbeddingMosaic:
@@ -24,6 +91,8 @@ class EmbeddingMosaic:
         bbox: tuple[float, float, float, float],
         year: int = 2024,
         tile_size: float = 0.1,
+        storage: Storage = "dense",
+        index_valid: bool = True,
     ):
         """
         Initialize the mosaic for a given bounding box.
@@ -33,79 +102,152 @@ class EmbeddingMosaic:
             bbox: (min_lon, min_lat, max_lon, max_lat)
             year: Year of embeddings to load
             tile_size: Size of each tile in degrees (default 0.1°)
+            storage: "dense" to stitch a float32 mosaic of the whole tile
+                rectangle in memory, "quantized" to keep the int8 values and
+                scales of the present tiles in memory (a quarter of the
+                memory, less where tiles are missing), or "mmap" to
+                memory-map the present tiles; both of the latter dequantize
+                on access
+            index_valid: Build the valid-pixel mask and index at load. It
+                costs 9 bytes per pixel, so callers that only read blocks
+                can skip it; it is then built on first use of valid_mask
+                or valid_indices.
         """
+        if storage not in ("dense", "quantized", "mmap"):
+            raise ValueError(f"Unknown storage: {storage}")
+
         self.cache_dir = Path(cache_dir)
         self.bbox = bbox
         self.year = year
         self.tile_size = tile_size
+        self.storage = storage
+        self.index_valid = index_valid
 
         self._mosaic: Optional[np.ndarray] = None
+        # (row, col) slot of each present tile -> its int8 data and scales
+        # (memory maps, or resident copies with quantized storage)
+        self._tiles: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
+        self._tile_shape: tuple[int, int] = (0, 0)
+        # (row, col) of each present tile in the mosaic grid -> its (height, width)
+        self._tile_slots: dict[tuple[int, int], tuple[int, int]] = {}
+        self._shape: Optional[tuple[int, int, int]] = None
         self._transform: Optional[Affine] = None
+        self._valid_mask: Optional[np.ndarray] = None
+        self._valid_indices: Optional[np.ndarray] = None
+        # (H, tile columns) valid pixels per row of each tile column, standing
+        # in for the valid-pixel index when it was skipped at load
+        self._valid_counts: Optional[np.ndarray] = None
         self._tile_coords: list[tuple[float, float]] = []
+        self._store: Optional[TileStore] = None
+        self._store_chunks: dict[tuple[float, float], int] = {}
+        self._tile_chunks: dict[tuple[int, int], int] = {}
 
-    def load(self) -> None:
-        """Load and stitch tiles covering the bounding box."""
-        min_lon, min_lat, max_lon, max_lat = self.bbox
+    def _open_tiles(self) -> dict[tuple[float, float], tuple[np.ndarray, np.ndarray]]:
+        """
+        Memory-map the tiles covering the bounding box. Returns {(lon, lat): (data, scales)}.
+
+        A consolidated tile store (see pack_tiles.py) is preferred: its
+        tiles are views of one memory map. Next, with a tile catalog (see
+        scan_tiles.py) the present tiles are looked up in it and opened
+        directly; otherwise each candidate tile's files are probed.
+        """
         tile_dir = self.cache_dir / str(self.year)
+        store = TileStore.find(tile_dir, self.tile_size)
+        if store is not None:
+            self._store = store
+            self._store_chunks = store.query(self.bbox)
+            return {key: store.tile(chunk) for key, chunk in self._store_chunks.items()}
 
-        # Calculate tile grid covering bbox
-        step = self.tile_size
-        # Tiles are named by their center, offset by half step
-        half_step = step / 2
+        catalog = TileCatalog.find(tile_dir, self.tile_size)
+        if catalog is not None:
+            return {key: catalog.open(entry) for key, entry in catalog.query(self.bbox).items()}
 
-        tile_lons = np.arange(
-            np.floor((min_lon + half_step) / step) * step - half_step,
-            max_lon + step,
-            step
-        )
-        tile_lats = np.arange(
-            np.floor((min_lat + half_step) / step) * step - half_step,
-            max_lat + step,
-            step
-        )
+        tiles: dict[tuple[float, float], tuple[np.ndarray, np.ndarray]] = {}
+        for key in tile_keys(self.bbox, self.tile_size):
+            name = tile_name(*key)
+            npy_path = tile_dir / name / f"{name}.npy"
+            scales_path = tile_dir / name / f"{name}_scales.npy"
+
+            if npy_path.exists() and scales_path.exists():
+                tiles[key] = (np.load(npy_path, mmap_mode="r"), np.load(scales_path, mmap_mode="r"))
 
-        # Load available tiles
-        tiles: dict[tuple[float, float], np.ndarray] = {}
-        for tlon in tile_lons:
-            for tlat in tile_lats:
-                tlon_r, tlat_r = round(tlon, 2), round(tlat, 2)
-                name = f"grid_{tlon_r:.2f}_{tlat_r:.2f}"
-                npy_path = tile_dir / name / f"{name}.npy"
-                scales_path = tile_dir / name / f"{name}_scales.npy"
-
-                if npy_path.exists() and scales_path.exists():
-                    data = np.load(npy_path).astype(np.float32)
-                    scales = np.load(scales_path)
-                    # Dequantize: multiply by scales
-                    tiles[(tlon_r, tlat_r)] = data * scales[:, :, np.newaxis]
+        return tiles
+
+    def load(self) -> None:
+        """Load the tiles covering the bounding box (stitched into one array with dense storage)."""
+        # Tiles are memory-mapped; nothing is read until a tile is indexed
+        tiles = self._open_tiles()
 
         if not tiles:
+            tile_dir = self.cache_dir / str(self.year)
             raise ValueError(f"No tiles found in {tile_dir} for bbox {self.bbox}")
 
         self._tile_coords = list(tiles.keys())
 
         # Get dimensions from first tile
-        sample_tile = next(iter(tiles.values()))
+        sample_tile, _ = next(iter(tiles.values()))
         tile_h, tile_w, n_channels = sample_tile.shape
+        self._tile_shape = (tile_h, tile_w)
 
         # Sort coordinates for stitching
         unique_lons = sorted(set(t[0] for t in tiles.keys()))
         unique_lats = sorted(set(t[1] for t in tiles.keys()), reverse=True)
 
-        # Create mosaic array
         mosaic_h = len(unique_lats) * tile_h
         mosaic_w = len(unique_lons) * tile_w
-        self._mosaic = np.zeros((mosaic_h, mosaic_w, n_channels), dtype=np.float32)
-
-        # Stitch tiles
-        for i, tlat in enumerate(unique_lats):
-            for j, tlon in enumerate(unique_lons):
-                if (tlon, tlat) in tiles:
-                    tile = tiles[(tlon, tlat)]
-                    h, w = tile.shape[:2]
-                    self._mosaic[i*tile_h:i*tile_h+h, j*tile_w:j*tile_w+w, :] = tile
+        self._shape = (mosaic_h, mosaic_w, n_channels)
+
+        # Position of each tile in the mosaic grid
+        slots = {
+            (i, j): (tlon, tlat)
+            for i, tlat in enumerate(unique_lats)
+            for j, tlon in enumerate(unique_lons)
+            if (tlon, tlat) in tiles
+        }
+        self._tile_slots = {slot: tiles[key][0].shape[:2] for slot, key in slots.items()}
+
+        if self.storage == "mmap":
+            # Keep only the memory maps; pixels are dequantized when read
+            self._tiles = {slot: tiles[key] for slot, key in slots.items()}
+            if self._store is not None:
+                self._tile_chunks = {slot: self._store_chunks[key] for slot, key in slots.items()}
+        elif self.storage == "dense":
+            # Dequantized tiles are stitched into one float32 mosaic
+            self._mosaic = np.zeros(self._shape, dtype=np.float32)
+
+        # Index valid (non-empty) pixels once, from the int8 values; missing tiles stay invalid
+        valid_mask = np.zeros((mosaic_h, mosaic_w), dtype=bool) if self.index_valid else None
+
+        def fill(slot: tuple[int, int]) -> None:
+            """Decode one tile straight into its slot of the preallocated mosaic, or copy it in."""
+            i, j = slot
+            data, scales = tiles[slots[slot]]
+            h, w = data.shape[:2]
+            rows = slice(i * tile_h, i * tile_h + h)
+            cols = slice(j * tile_w, j * tile_w + w)
+            if self._mosaic is not None:
+                # Dequantize: multiply by scales
+                np.multiply(data, scales[:, :, np.newaxis], out=self._mosaic[rows, cols])
+            elif self.storage == "quantized":
+                # Read the int8 values and per-pixel scales without dequantizing
+                self._tiles[slot] = (np.array(data), np.array(scales))
+            if valid_mask is not None:
+                valid_mask[rows, cols] = _quantized_valid_mask(data, scales)
+
+        # Tiles fill disjoint slots and NumPy releases the GIL while reading,
+        # copying and multiplying, so they are decoded in parallel (a dict
+        # item assignment per tile is atomic)
+        if self.storage != "mmap" or valid_mask is not None:
+            with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(slots))) as pool:
+                for _ in pool.map(fill, slots):
+                    pass
+
+        if valid_mask is not None:
+            self._valid_mask = valid_mask
+            self._valid_indices = np.flatnonzero(valid_mask)
 
         # Create geotransform
+        step = self.tile_size
         mosaic_min_lon = min(unique_lons)
         mosaic_max_lat = max(unique_lats) + step
         self._transform = rasterio.transform.from_bounds(
@@ -117,12 +259,182 @@ class EmbeddingMosaic:
             mosaic_h
         )
 
+    def _index_valid_pixels(self) -> None:
+        """Build the valid-pixel mask and index after a load with index_valid=False."""
+        h, w, _ = self.shape
+        if self._tiles:
+            # Scan only the tiles that are present, from their int8 values
+            valid_mask = np.zeros((h, w), dtype=bool)
+            tile_h, tile_w = self._tile_shape
+            for (i, j), (data, scales) in self._tiles.items():
+                th, tw = data.shape[:2]
+                valid_mask[i*tile_h:i*tile_h+th, j*tile_w:j*tile_w+tw] = _quantized_valid_mask(data, scales)
+        else:
+            valid_mask = np.empty((h, w), dtype=bool)
+            block_rows = max(1, _SCAN_BLOCK_PIXELS // w)
+            for row0 in range(0, h, block_rows):
+                row1 = min(row0 + block_rows, h)
+                np.any(self._read_window(row0, row1, 0, w) != 0, axis=-1, out=valid_mask[row0:row1])
+        self._valid_mask = valid_mask
+        self._valid_indices = np.flatnonzero(valid_mask)
+
+    def share(self, directory: Path) -> SharedMosaic:
+        """
+        Make the loaded mosaic available to other processes without pickling it.
+
+        Resident arrays (and resident quantized tiles) are written once as
+        .npy files under directory (use a tmpfs such as /dev/shm to keep them
+        in RAM); memory-mapped tiles are referenced by path. Workers open the
+        result with attach().
+
+        Args:
+            directory: Existing directory that outlives the worker processes
+        """
+        if self._shape is None:
+            self.load()
+        directory = Path(directory)
+
+        arrays = {}
+        for name in _SHARED_ARRAYS:
+            array = getattr(self, name)
+            if array is not None:
+                path = directory / f"{name.lstrip('_')}.npy"
+                np.save(path, array)
+                arrays[name] = path
+
+        tiles = {}
+        for (i, j), (data, scales) in self._tiles.items():
+            if (i, j) in self._tile_chunks:
+                continue
+            if self.storage == "mmap":
+                tiles[i, j] = (Path(data.filename), Path(scales.filename))
+            else:
+                tiles[i, j] = (directory / f"tile_{i}_{j}.npy", directory / f"tile_{i}_{j}_scales.npy")
+                np.save(tiles[i, j][0], data)
+                np.save(tiles[i, j][1], scales)
+
+        return SharedMosaic(
+            cache_dir=self.cache_dir,
+            bbox=self.bbox,
+            year=self.year,
+            tile_size=self.tile_size,
+            storage=self.storage,
+            shape=self._shape,
+            tile_shape=self._tile_shape,
+            transform=tuple(self._transform)[:6],
+            tile_coords=list(self._tile_coords),
+            tile_slots=dict(self._tile_slots),
+            arrays=arrays,
+            tiles=tiles,
+            store=self._store.path if self._store is not None else None,
+            chunks=dict(self._tile_chunks),
+        )
+
+    @classmethod
+    def attach(cls, shared: SharedMosaic) -> "EmbeddingMosaic":
+        """Open a mosaic shared by another process; all arrays are read-only memory maps."""
+        instance = cls(
+            shared.cache_dir,
+            shared.bbox,
+            year=shared.year,
+            tile_size=shared.tile_size,
+            storage=shared.storage,
+        )
+        for name, path in shared.arrays.items():
+            setattr(instance, name, np.load(path, mmap_mode="r"))
+        instance._tiles = {
+            slot: (np.load(data_path, mmap_mode="r"), np.load(scales_path, mmap_mode="r"))
+            for slot, (data_path, scales_path) in shared.tiles.items()
+        }
+        if shared.store is not None:
+            instance._store = TileStore(shared.store)
+            instance._tile_chunks = dict(shared.chunks)
+            instance._tiles.update(
+                (slot, instance._store.tile(chunk)) for slot, chunk in shared.chunks.items()
+            )
+        instance._shape = shared.shape
+        instance._tile_shape = shared.tile_shape
+        instance._transform = Affine(*shared.transform)
+        instance._tile_coords = list(shared.tile_coords)
+        instance._tile_slots = dict(shared.tile_slots)
+        return instance
+
+    def _read_window(self, row0: int, row1: int, col0: int, col1: int) -> np.ndarray:
+        """Dequantized embeddings for mosaic rows [row0, row1) and cols [col0, col1)."""
+        if self._mosaic is not None:
+            return self._mosaic[row0:row1, col0:col1]
+
+        n_channels = self._shape[2]
+        tile_h, tile_w = self._tile_shape
+        out = np.zeros((row1 - row0, col1 - col0, n_channels), dtype=np.float32)
+
+        for i in range(row0 // tile_h, (row1 - 1) // tile_h + 1):
+            for j in range(col0 // tile_w, (col1 - 1) // tile_w + 1):
+                tile = self._tiles.get((i, j))
+                if tile is None:
+                    continue
+                data, scales = tile
+                # Intersection of the window with this tile, in tile pixel coordinates
+                r0 = max(row0 - i * tile_h, 0)
+                r1 = min(row1 - i * tile_h, data.shape[0])
+                c0 = max(col0 - j * tile_w, 0)
+                c1 = min(col1 - j * tile_w, data.shape[1])
+                if r0 >= r1 or c0 >= c1:
+                    continue
+                out_r0 = i * tile_h + r0 - row0
+                out_c0 = j * tile_w + c0 - col0
+                np.multiply(
+                    data[r0:r1, c0:c1],
+                    scales[r0:r1, c0:c1, np.newaxis],
+                    out=out[out_r0:out_r0 + r1 - r0, out_c0:out_c0 + c1 - c0],
+                )
+
+        return out
+
+    def _gather(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Dequantized embeddings at in-bounds pixel indices, shape (N, C)."""
+        if self._mosaic is not None:
+            return self._mosaic[rows, cols]
+
+        n_channels = self._shape[2]
+        tile_h, tile_w = self._tile_shape
+        out = np.zeros((len(rows), n_channels), dtype=np.float32)
+
+        # Group pixels by tile so each tile is indexed once
+        n_tile_cols = self._shape[1] // tile_w
+        tile_rows, in_rows = np.divmod(rows, tile_h)
+        tile_cols, in_cols = np.divmod(cols, tile_w)
+        tile_ids = tile_rows * n_tile_cols + tile_cols
+        order = np.argsort(tile_ids, kind="stable")
+        unique_ids, starts = np.unique(tile_ids[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+
+        for tile_id, start, end in zip(unique_ids, starts, ends):
+            tile = self._tiles.get(divmod(int(tile_id), n_tile_cols))
+            if tile is None:
+                continue
+            data, scales = tile
+            sel = order[start:end]
+            r, c = in_rows[sel], in_cols[sel]
+            inside = (r < data.shape[0]) & (c < data.shape[1])
+            sel, r, c = sel[inside], r[inside], c[inside]
+            out[sel] = data[r, c] * scales[r, c, np.newaxis]
+
+        return out
+
     @property
-    def mosaic(self) -> np.ndarray:
-        """Get the loaded mosaic array (H, W, C)."""
-        if self._mosaic is None:
+    def mosaic(self) -> Union[np.ndarray, "_LazyMosaic"]:
+        """
+        Get the loaded mosaic array (H, W, C).
+
+        With quantized or mmap storage this is a read-only view that
+        dequantizes only the pixels it is indexed with.
+        """
+        if self._shape is None:
             self.load()
-        return self._mosaic
+        if self._mosaic is not None:
+            return self._mosaic
+        return _LazyMosaic(self)
 
     @property
     def transform(self) -> Affine:
@@ -134,7 +446,9 @@ class EmbeddingMosaic:
     @property
     def shape(self) -> tuple[int, int, int]:
         """Get mosaic shape (height, width, channels)."""
-        return self.mosaic.shape
+        if self._shape is None:
+            self.load()
+        return self._shape
 
     @property
     def n_pixels(self) -> int:
@@ -142,6 +456,98 @@ class EmbeddingMosaic:
         h, w, _ = self.shape
         return h * w
 
+    @property
+    def valid_mask(self) -> np.ndarray:
+        """(H, W) mask of pixels with data, i.e. not all-zero embeddings. Computed at load."""
+        if self._shape is None:
+            self.load()
+        if self._valid_mask is None:
+            self._index_valid_pixels()
+        return self._valid_mask
+
+    @property
+    def valid_indices(self) -> np.ndarray:
+        """Sorted flat (row * W + col) indices of valid pixels. Computed at load."""
+        if self._shape is None:
+            self.load()
+        if self._valid_indices is None:
+            self._index_valid_pixels()
+        return self._valid_indices
+
+    @property
+    def n_valid(self) -> int:
+        """Number of valid pixels, counted without building the valid-pixel index if it was skipped."""
+        if self._shape is None:
+            self.load()
+        if self._valid_indices is not None or not self._tiles:
+            return len(self.valid_indices)
+        return int(self._count_valid().sum())
+
+    def valid_indices_at(self, ranks: np.ndarray) -> np.ndarray:
+        """
+        valid_indices[ranks], without building the valid-pixel index if it was skipped.
+
+        Valid pixels are then counted per row of each tile column in one scan
+        of the present tiles, and only the tile rows the ranks fall in are
+        read again, so memory stays proportional to the height of the mosaic.
+        """
+        if self._shape is None:
+            self.load()
+        if self._valid_indices is not None or not self._tiles:
+            return self.valid_indices[ranks]
+
+        w = self._shape[1]
+        tile_h, tile_w = self._tile_shape
+        counts = self._count_valid()
+        ends = np.cumsum(counts.ravel())
+        ranks = np.asarray(ranks, dtype=np.int64)
+        # Row-major valid-pixel order visits each mosaic row tile column by tile column
+        segments = np.searchsorted(ends, ranks, side="right")
+        within = ranks - (ends[segments] - counts.ravel()[segments])
+
+        out = np.empty(len(ranks), dtype=np.int64)
+        order = np.argsort(segments, kind="stable")
+        unique_segments, starts = np.unique(segments[order], return_index=True)
+        for segment, sel in zip(unique_segments, np.split(order, starts[1:])):
+            row, j = divmod(int(segment), counts.shape[1])
+            i, r = divmod(row, tile_h)
+            data, scales = self._tiles[i, j]
+            cols = np.flatnonzero(_quantized_valid_mask(data[r:r + 1], scales[r:r + 1])[0])
+            out[sel] = row * w + j * tile_w + cols[within[sel]]
+        return out
+
+    def _count_valid(self) -> np.ndarray:
+        """(H, tile columns) valid pixels in each row of each tile column, from the int8 tiles."""
+        if self._valid_counts is None:
+            h, w, _ = self.shape
+            tile_h, tile_w = self._tile_shape
+            counts = np.zeros((h, w // tile_w), dtype=np.int64)
+            for (i, j), (data, scales) in self._tiles.items():
+                counts[i * tile_h:i * tile_h + data.shape[0], j] = _quantized_valid_mask(data, scales).sum(axis=1)
+            self._valid_counts = counts
+        return self._valid_counts
+
+    def sample_at_points(
+        self,
+        lons: np.ndarray,
+        lats: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sample embeddings at arrays of coordinates.
+
+        Args:
+            lons: Longitudes, shape (N,)
+            lats: Latitudes, shape (N,)
+
+        Returns:
+            Tuple of (embeddings array (M, C), indices of the M input points
+            that fall inside the mosaic)
+        """
+        h, w, _ = self.shape
+        rows, cols = self.coords_to_pixels(lons, lats)
+        valid_idx = np.flatnonzero((rows >= 0) & (rows < h) & (cols >= 0) & (cols < w))
+        return self._gather(rows[valid_idx], cols[valid_idx]), valid_idx
+
     def sample_at_coords(
         self,
         coords: list[tuple[float, float]]
@@ -155,24 +561,90 @@ class EmbeddingMosaic:
         Returns:
             Tuple of (embeddings array, valid coordinates list)
         """
-        mosaic = self.mosaic
-        h, w = mosaic.shape[:2]
+        if not coords:
+            return np.array([]), []
 
-        embeddings = []
-        valid_coords = []
+        lons, lats = np.asarray(coords, dtype=np.float64).T
+        embeddings, valid_idx = self.sample_at_points(lons, lats)
+        if len(valid_idx) == 0:
+            return np.array([]), []
+        return embeddings, [coords[i] for i in valid_idx]
 
-        for lon, lat in coords:
-            row, col = rasterio.transform.rowcol(self.transform, lon, lat)
-            if 0 <= row < h and 0 <= col < w:
-                embeddings.append(mosaic[row, col, :])
-                valid_coords.append((lon, lat))
+    def get_all_embeddings(self) -> Union[np.ndarray, "_LazyEmbeddings"]:
+        """
+        Get all embeddings as a flat array (N, C).
 
-        return np.array(embeddings) if embeddings else np.array([]), valid_coords
+        With quantized or mmap storage this is a read-only view; slicing it
+        (as the classifiers do batch by batch) dequantizes only that batch.
+        """
+        if self._shape is None:
+            self.load()
+        if self._mosaic is not None:
+            return self._mosaic.reshape(-1, self._shape[-1])
+        return _LazyEmbeddings(self)
 
-    def get_all_embeddings(self) -> np.ndarray:
-        """Get all embeddings as a flat array (N, C)."""
-        mosaic = self.mosaic
-        return mosaic.reshape(-1, mosaic.shape[-1])
+    def tile_windows(self) -> list[Window]:
+        """Mosaic windows of the tiles that are present, north to south and west to east."""
+        if self._shape is None:
+            self.load()
+        tile_h, tile_w = self._tile_shape
+        return [
+            Window(j * tile_w, i * tile_h, w, h)
+            for (i, j), (h, w) in sorted(self._tile_slots.items())
+        ]
+
+    def iter_tiles(
+        self,
+        max_pixels: Optional[int] = None,
+        align: Optional[int] = None,
+    ) -> Iterator[tuple[Window, np.ndarray, Affine]]:
+        """
+        Iterate over the present tiles as dequantized blocks.
+
+        Missing tiles are skipped, so the work scales with the covered area
+        rather than the bbox. Each row of tiles is walked band by band, and
+        with quantized or mmap storage each block is read from its tile
+        alone.
+
+        Args:
+            max_pixels: Split tiles into bands of whole rows with at most
+                this many pixels (at least one row)
+            align: Make bands a whole multiple of this many rows when they
+                are taller and start them on multiples of their height in
+                the mosaic, so an output raster tiled in align x align
+                blocks is written one strip of blocks at a time
+
+        Yields:
+            (window in the mosaic, embeddings (h, w, C), transform of the block)
+        """
+        for row_off, row_windows in groupby(self.tile_windows(), key=lambda win: win.row_off):
+            row_windows = list(row_windows)
+            row_end = max(win.row_off + win.height for win in row_windows)
+            band_rows = row_end - row_off
+            if max_pixels is not None:
+                widest = max(win.width for win in row_windows)
+                band_rows = max(1, min(band_rows, max_pixels // widest))
+            if align is not None and band_rows > align:
+                band_rows -= band_rows % align
+
+            bands = []
+            row0 = row_off
+            while row0 < row_end:
+                row1 = (row0 // band_rows + 1) * band_rows if align is not None else row0 + band_rows
+                bands.append((row0, min(row1, row_end)))
+                row0 = bands[-1][1]
+
+            for band_row0, band_row1 in bands:
+                for window in row_windows:
+                    row1 = min(band_row1, window.row_off + window.height)
+                    if band_row0 >= row1:
+                        continue
+                    block = Window(window.col_off, band_row0, window.width, row1 - band_row0)
+                    yield (
+                        block,
+                        self._read_window(band_row0, row1, window.col_off, window.col_off + window.width),
+                        rasterio.windows.transform(block, self._transform),
+                    )
 
     def pixel_to_coords(self, row: int, col: int) -> tuple[float, float]:
         """Convert pixel coordinates to geographic coordinates."""
@@ -183,3 +655,142 @@ class EmbeddingMosaic:
         """Convert geographic coordinates to pixel coordinates."""
         row, col = rasterio.transform.rowcol(self.transform, lon, lat)
         return row, col
+
+    def pixels_to_coords(self, rows: np.ndarray, cols: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Convert arrays of pixel indices to pixel-center coordinates (lons, lats)."""
+        lons, lats = self.transform * (np.asarray(cols) + 0.5, np.asarray(rows) + 0.5)
+        return lons, lats
+
+    def coords_to_pixels(self, lons: np.ndarray, lats: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Convert arrays of coordinates to pixel indices (rows, cols) in one affine step."""
+        cols, rows = ~self.transform * (np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+        return np.floor(rows).astype(np.int64), np.floor(cols).astype(np.int64)
+
+
+def _normalize_index(index, size: int) -> Union[int, slice, np.ndarray]:
+    """Resolve negative integers and array-likes for one mosaic axis."""
+    if isinstance(index, slice):
+        return index
+    if np.ndim(index) == 0:
+        index = int(index)
+        if not -size <= index < size:
+            raise IndexError(f"index {index} is out of bounds for axis with size {size}")
+        return index % size
+    index = np.asarray(index)
+    if index.dtype == bool:
+        return np.flatnonzero(index)
+    return np.where(index < 0, index + size, index)
+
+
+class _LazyMosaic:
+    """
+    Read-only (H, W, C) view of a quantized or memory-mapped mosaic.
+
+    Supports integer, slice and integer-array indexing on the row and
+    column axes; only the indexed pixels are dequantized.
+    """
+
+    ndim = 3
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, owner: EmbeddingMosaic):
+        self._owner = owner
+        self.shape = owner.shape
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        h, w, _ = self.shape
+        out = self._owner._read_window(0, h, 0, w)
+        return out if dtype is None else out.astype(dtype)
+
+    def __getitem__(self, key) -> np.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (3 - len(key))
+        row_key, col_key, channel_key = key
+        h, w, _ = self.shape
+        row_key = _normalize_index(row_key, h)
+        col_key = _normalize_index(col_key, w)
+
+        if isinstance(row_key, np.ndarray) or isinstance(col_key, np.ndarray):
+            # Fancy indexing: broadcast rows against cols and gather pixels.
+            # A slice adds its own axis, after an array of rows or before an
+            # array of cols, as in NumPy
+            if isinstance(row_key, slice):
+                row_key = np.arange(h)[row_key].reshape((-1,) + (1,) * np.ndim(col_key))
+            elif isinstance(col_key, slice):
+                row_key = row_key[..., np.newaxis]
+                col_key = np.arange(w)[col_key]
+            rows, cols = np.broadcast_arrays(row_key, col_key)
+            out = self._owner._gather(rows.ravel(), cols.ravel())
+            return out.reshape(rows.shape + (-1,))[..., channel_key]
+
+        row_slice = row_key if isinstance(row_key, slice) else slice(row_key, row_key + 1)
+        col_slice = col_key if isinstance(col_key, slice) else slice(col_key, col_key + 1)
+        r0, r1, r_step = row_slice.indices(h)
+        c0, c1, c_step = col_slice.indices(w)
+        if r_step < 0 or c_step < 0:
+            return np.asarray(self)[key]
+        if r0 >= r1 or c0 >= c1:
+            return np.zeros((0, 0, self.shape[2]), dtype=np.float32)[..., channel_key]
+
+        out = self._owner._read_window(r0, r1, c0, c1)[::r_step, ::c_step]
+        if isinstance(col_key, int):
+            out = out[:, 0]
+        if isinstance(row_key, int):
+            out = out[0]
+        return out[..., channel_key]
+
+
+class _LazyEmbeddings:
+    """
+    Read-only flat (N, C) view of a quantized or memory-mapped mosaic.
+
+    Slicing a contiguous range dequantizes only the rows it spans, so
+    batch-wise scoring keeps memory proportional to the batch.
+    """
+
+    ndim = 2
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, owner: EmbeddingMosaic):
+        self._owner = owner
+        h, w, c = owner.shape
+        self._width = w
+        self.shape = (h * w, c)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        h, w, c = self._owner.shape
+        out = self._owner._read_window(0, h, 0, w).reshape(-1, c)
+        return out if dtype is None else out.astype(dtype)
+
+    def __getitem__(self, key) -> np.ndarray:
+        channel_key = slice(None)
+        if isinstance(key, tuple):
+            key, channel_key = key
+
+        n = self.shape[0]
+        w = self._width
+
+        if isinstance(key, slice):
+            start, stop, step = key.indices(n)
+            if step != 1:
+                return self[np.arange(start, stop, step), channel_key]
+            if start >= stop:
+                return np.zeros((0, self.shape[1]), dtype=np.float32)[:, channel_key]
+            row0, row1 = start // w, (stop - 1) // w + 1
+            block = self._owner._read_window(row0, row1, 0, w).reshape(-1, self.shape[1])
+            offset = row0 * w
+            return block[start - offset:stop - offset, channel_key]
+
+        index = _normalize_index(key, n)
+        rows, cols = np.divmod(np.atleast_1d(index), w)
+        out = self._owner._gather(rows, cols)
+        if np.ndim(index) == 0:
+            out = out[0]
+        return out[..., channel_key]
@@ -2,95 +2,303 @@
 GBIF API interactions for fetching species data and occurrences.
 """
 
-import requests
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import Optional
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_species_key(species_name: str) -> int:
-    """Look up GBIF taxon key for a species name."""
-    resp = requests.get(
-        "https://api.gbif.org/v1/species/match",
-        params={"name": species_name}
-    )
-    resp.raise_for_status()
-    data = resp.json()
-    key = data.get("usageKey")
-    if not key:
-        raise ValueError(f"Species not found: {species_name}")
-    return key
+from .store import Coverage, NameCache, OccurrenceStore
 
+logger = logging.getLogger(__name__)
 
-def get_species_info(species_name: str) -> dict:
-    """Get species information including taxon key and matched name."""
-    resp = requests.get(
-        "https://api.gbif.org/v1/species/match",
-        params={"name": species_name}
-    )
+GBIF_API = "https://api.gbif.org/v1"
+PAGE_SIZE = 300
+MAX_IN_FLIGHT = 8
+REQUEST_TIMEOUT = 60
+# The search API rejects offset + limit beyond this
+MAX_SEARCH_RECORDS = 100_000
+# Name matches below this confidence (0-100) or of another match type
+# (e.g. HIGHERRANK) are not cached
+MIN_MATCH_CONFIDENCE = 90
+CACHEABLE_MATCH_TYPES = ("EXACT", "FUZZY")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# Bounds requests in flight across all threads, however many pools are
+# fetching at once, to the session's connection pool size
+_in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+
+
+def _get_session() -> requests.Session:
+    """Shared session with pooled connections and retries on 429/5xx."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET"}),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(pool_maxsize=MAX_IN_FLIGHT, max_retries=retry)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _get(path: str, params: dict) -> dict:
+    with _in_flight:
+        resp = _get_session().get(f"{GBIF_API}{path}", params=params, timeout=REQUEST_TIMEOUT)
     resp.raise_for_status()
-    data = resp.json()
+    return resp.json()
+
+
+def get_species_key(species_name: str, cache: Optional[NameCache] = None) -> int:
+    """Look up GBIF taxon key for a species name."""
+    return get_species_info(species_name, cache)["taxon_key"]
+
+
+def get_species_info(species_name: str, cache: Optional[NameCache] = None) -> dict:
+    """
+    Get species information including taxon key and matched name.
+
+    With a cache, a previously resolved name is returned without a request.
+    Only exact or fuzzy matches with confidence >= MIN_MATCH_CONFIDENCE are
+    cached; weaker matches are returned with a warning and resolved again
+    next time.
+    """
+    if cache is not None:
+        info = cache.get(species_name)
+        if info is not None:
+            return info
+
+    data = _get("/species/match", {"name": species_name})
     if not data.get("usageKey"):
         raise ValueError(f"Species not found: {species_name}")
-    return {
+    info = {
         "taxon_key": data["usageKey"],
         "scientific_name": data.get("scientificName", species_name),
         "canonical_name": data.get("canonicalName", species_name),
         "rank": data.get("rank"),
         "confidence": data.get("confidence", 0),
+        "match_type": data.get("matchType"),
     }
 
+    if cache is not None:
+        if info["match_type"] in CACHEABLE_MATCH_TYPES and info["confidence"] >= MIN_MATCH_CONFIDENCE:
+            cache.put(species_name, info)
+        else:
+            logger.warning(
+                f"Low-confidence match for {species_name!r}: {info['scientific_name']} "
+                f"({info['match_type']}, confidence {info['confidence']}), not cached"
+            )
+    return info
 
-def fetch_occurrences(
+
+def resolve_species(
+    names: list[str],
+    cache: Optional[NameCache] = None,
+    max_workers: int = MAX_IN_FLIGHT,
+) -> dict[str, Optional[dict]]:
+    """
+    Resolve many species names, looking up cache misses concurrently.
+
+    Args:
+        names: Species names
+        cache: Name cache to consult and fill
+        max_workers: Concurrent lookups (requests in flight are further
+            bounded by MAX_IN_FLIGHT across all callers)
+
+    Returns:
+        Dict of name -> species info (as get_species_info), or None for
+        names GBIF could not match or that failed to resolve
+    """
+    names = list(dict.fromkeys(names))
+    resolved: dict[str, Optional[dict]] = cache.get_many(names) if cache is not None else {}
+    misses = [name for name in names if name not in resolved]
+
+    def resolve(name: str) -> Optional[dict]:
+        try:
+            return get_species_info(name, cache)
+        except ValueError:
+            return None
+        except requests.RequestException as e:
+            logger.warning(f"Could not resolve {name!r}: {e}")
+            return None
+
+    if misses:
+        logger.info(f"Resolving {len(misses)} species names ({len(resolved)} cached)")
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            resolved.update(zip(misses, pool.map(resolve, misses)))
+
+    return {name: resolved[name] for name in names}
+
+
+def _fetch_occurrence_records(
     taxon_key: int,
     bbox: tuple[float, float, float, float],
-    limit: Optional[int] = None
-) -> list[tuple[float, float]]:
+    limit: Optional[int] = None,
+    interpreted_since: Optional[str] = None,
+) -> tuple[list[tuple[int, float, float]], bool]:
     """
-    Fetch occurrence coordinates from GBIF.
+    Page through the GBIF occurrence search API.
 
     Args:
         taxon_key: GBIF taxon key
         bbox: Bounding box as (min_lon, min_lat, max_lon, max_lat)
         limit: Maximum number of occurrences to fetch (None = all)
+        interpreted_since: Only records (re)interpreted on or after this
+            ISO date, for incremental refreshes
 
     Returns:
-        List of (longitude, latitude) tuples
+        (records, complete): list of (gbif_id, longitude, latitude) tuples,
+        and whether every record matching the query was fetched (False when
+        cut short by limit or MAX_SEARCH_RECORDS)
     """
     min_lon, min_lat, max_lon, max_lat = bbox
-    results = []
-    offset = 0
-    batch_size = 300
-
-    while True:
-        resp = requests.get(
-            "https://api.gbif.org/v1/occurrence/search",
-            params={
-                "taxonKey": taxon_key,
-                "hasCoordinate": "true",
-                "hasGeospatialIssue": "false",
-                "decimalLatitude": f"{min_lat},{max_lat}",
-                "decimalLongitude": f"{min_lon},{max_lon}",
-                "limit": batch_size,
-                "offset": offset,
-            }
+    params = {
+        "taxonKey": taxon_key,
+        "hasCoordinate": "true",
+        "hasGeospatialIssue": "false",
+        "decimalLatitude": f"{min_lat},{max_lat}",
+        "decimalLongitude": f"{min_lon},{max_lon}",
+    }
+    if interpreted_since:
+        params["lastInterpreted"] = f"{interpreted_since},*"
+
+    def fetch_page(offset: int) -> list[dict]:
+        # The last page stops at total, so offset + limit never passes MAX_SEARCH_RECORDS
+        data = _get("/occurrence/search", {**params, "limit": min(PAGE_SIZE, total - offset), "offset": offset})
+        return data.get("results", [])
+
+    # The first page tells us how many records there are, so the remaining
+    # offsets are known up front and can be fetched concurrently
+    first = _get("/occurrence/search", {**params, "limit": PAGE_SIZE, "offset": 0})
+    count = first.get("count", 0)
+    total = min(count, limit) if limit else count
+    if total > MAX_SEARCH_RECORDS:
+        logger.warning(
+            f"Taxon {taxon_key} has {total} records in bbox; the search API only pages "
+            f"through the first {MAX_SEARCH_RECORDS}"
         )
-        resp.raise_for_status()
-        data = resp.json()
-        batch = data.get("results", [])
+        total = MAX_SEARCH_RECORDS
+
+    pages = [first.get("results", [])]
+    offsets = range(PAGE_SIZE, total, PAGE_SIZE)
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(MAX_IN_FLIGHT, len(offsets))) as pool:
+            pages.extend(pool.map(fetch_page, offsets))
+
+    results = [
+        (r["key"], r["decimalLongitude"], r["decimalLatitude"])
+        for page in pages
+        for r in page
+        if r.get("decimalLatitude") is not None and r.get("decimalLongitude") is not None
+    ]
+    return (results[:limit] if limit else results), total >= count
+
+
+def _save_records(
+    store: OccurrenceStore,
+    taxon_key: int,
+    bbox: tuple[float, float, float, float],
+    records: list[tuple[int, float, float]],
+    complete: bool,
+) -> None:
+    """Store a fetch of bbox; only a complete one replaces the bbox and counts as coverage."""
+    if complete:
+        store.replace(taxon_key, bbox, records)
+    else:
+        # Without coverage the store never answers this bbox from a partial set
+        store.upsert(taxon_key, records)
+
+
+def _usable(coords: list[tuple[float, float]], limit: Optional[int]) -> list[tuple[float, float]]:
+    """Drop records with a zero coordinate (usually a placeholder) and apply limit."""
+    coords = [(lon, lat) for lon, lat in coords if lon and lat]
+    return coords[:limit] if limit else coords
+
+
+def _count_occurrences(taxon_key: int, bbox: tuple[float, float, float, float]) -> int:
+    """Number of occurrence records GBIF holds for the taxon inside bbox."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    data = _get(
+        "/occurrence/search",
+        {
+            "taxonKey": taxon_key,
+            "hasCoordinate": "true",
+            "hasGeospatialIssue": "false",
+            "decimalLatitude": f"{min_lat},{max_lat}",
+            "decimalLongitude": f"{min_lon},{max_lon}",
+            "limit": 0,
+        },
+    )
+    return data.get("count", 0)
 
-        if not batch:
-            break
 
-        for r in batch:
-            if r.get("decimalLatitude") and r.get("decimalLongitude"):
-                results.append((r["decimalLongitude"], r["decimalLatitude"]))
+def _refresh_store(store: OccurrenceStore, coverage: Coverage) -> None:
+    """Bring a stale coverage up to date, fetching only what changed if possible."""
+    since = datetime.fromtimestamp(coverage.fetched_at, tz=timezone.utc).date().isoformat()
+    fetched_at = time.time()
+    updated, complete = _fetch_occurrence_records(coverage.taxon_key, coverage.bbox, interpreted_since=since)
+    store.upsert(coverage.taxon_key, updated)
 
-        if limit and len(results) >= limit:
-            results = results[:limit]
-            break
+    # Deleted records do not show up in an incremental fetch; if the totals
+    # disagree (or the update was cut short), fall back to refetching the whole bbox
+    n_stored = store.count(coverage.taxon_key, coverage.bbox)
+    if not complete or n_stored != _count_occurrences(coverage.taxon_key, coverage.bbox):
+        records, complete = _fetch_occurrence_records(coverage.taxon_key, coverage.bbox)
+        _save_records(store, coverage.taxon_key, coverage.bbox, records, complete)
+    else:
+        store.record_coverage(coverage.taxon_key, coverage.bbox, n_stored, fetched_at)
+    logger.info(f"Refreshed stored occurrences for taxon {coverage.taxon_key} ({len(updated)} updated)")
 
-        if len(results) >= data.get("count", 0):
-            break
 
-        offset += batch_size
+def fetch_occurrences(
+    taxon_key: int,
+    bbox: tuple[float, float, float, float],
+    limit: Optional[int] = None,
+    store: Optional[OccurrenceStore] = None,
+) -> list[tuple[float, float]]:
+    """
+    Fetch occurrence coordinates from GBIF.
+
+    With a store, the bbox is answered locally when a fresh complete fetch
+    covers it. Stale coverage is refreshed incrementally, and if GBIF cannot
+    be reached the stored records are used as they are. A fetch cut short
+    at MAX_SEARCH_RECORDS is stored but not recorded as coverage, so it is
+    fetched again next time.
+
+    Args:
+        taxon_key: GBIF taxon key
+        bbox: Bounding box as (min_lon, min_lat, max_lon, max_lat)
+        limit: Maximum number of occurrences to fetch (None = all)
+        store: Local occurrence store to consult and update (None = always fetch)
+
+    Returns:
+        List of (longitude, latitude) tuples
+    """
+    if store is None:
+        records, _ = _fetch_occurrence_records(taxon_key, bbox, limit)
+        coords = [(lon, lat) for _, lon, lat in records]
+        return _usable(coords, limit)
+
+    coverage = store.find_coverage(taxon_key, bbox)
+    if coverage is None:
+        # The store only answers bboxes it holds completely, so fetch everything
+        records, complete = _fetch_occurrence_records(taxon_key, bbox)
+        _save_records(store, taxon_key, bbox, records, complete)
+    elif not store.is_fresh(coverage):
+        try:
+            _refresh_store(store, coverage)
+        except requests.RequestException as e:
+            logger.warning(f"Could not refresh occurrences for taxon {taxon_key}, using stored records: {e}")
 
-    return results
+    return _usable(store.query(taxon_key, bbox), limit)
@@ -20,6 +20,28 @@ import torch
 import torch.nn as nn
 from torch.utils.data import DataLoader, TensorDataset
 
+# Upper bound on hidden activations (rows x passes x units) per stacked MC forward
+MC_FORWARD_ELEMENTS = 1 << 24
+
+
+def _take_rows(embeddings: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Gather sorted row indices, reading one contiguous slice when they are dense."""
+    start, stop = int(indices[0]), int(indices[-1]) + 1
+    if stop - start <= 2 * len(indices):
+        return embeddings[start:stop][indices - start]
+    return embeddings[indices]
+
+
+def _sigmoid_(x: np.ndarray) -> np.ndarray:
+    """Logistic sigmoid computed in place."""
+    # exp overflows to inf for very negative logits, which correctly gives 0
+    with np.errstate(over="ignore"):
+        np.negative(x, out=x)
+        np.exp(x, out=x)
+        x += 1
+        np.reciprocal(x, out=x)
+    return x
+
 
 class ClassifierMethod:
     """
@@ -33,6 +55,9 @@ class ClassifierMethod:
     def __init__(self):
         self._model: Optional[LogisticRegression] = None
         self._scaler: Optional[StandardScaler] = None
+        # Scaler folded into the linear model, derived lazily (see _linear_params)
+        self._weights: Optional[np.ndarray] = None
+        self._bias: float = 0.0
 
     def fit(
         self,
@@ -62,26 +87,81 @@ class ClassifierMethod:
         # Train classifier
         self._model = LogisticRegression(max_iter=1000, solver="lbfgs")
         self._model.fit(X_scaled, y)
+        self._weights = None
+
+    def _linear_params(self) -> tuple[np.ndarray, float]:
+        """
+        Scaler and logistic regression folded into one float32 weight vector
+        and bias: coef . (x - mean) / scale + intercept = w . x + b.
+
+        Derived on first use, so models pickled before this existed still load.
+        """
+        if self._model is None:
+            raise ValueError("Must call fit() first")
+        if self._weights is None:
+            coef = self._model.coef_[0].astype(np.float64)
+            mean = self._scaler.mean_ if self._scaler.mean_ is not None else 0.0
+            scale = self._scaler.scale_ if self._scaler.scale_ is not None else 1.0
+            weights = coef / scale
+            self._bias = float(self._model.intercept_[0] - np.sum(weights * mean))
+            self._weights = weights.astype(np.float32)
+        return self._weights, self._bias
+
+    def score_pixels(
+        self,
+        embeddings: np.ndarray,
+        out: Optional[np.ndarray] = None,
+        chunk_size: int = 8192,
+    ) -> np.ndarray:
+        """
+        Probability of positive class for every row, as one matvec plus an
+        in-place sigmoid per chunk.
+
+        Args:
+            embeddings: Embeddings to score, shape (N, C)
+            out: Optional preallocated float32 (N,) output array
+            chunk_size: Rows per chunk; small enough that a chunk stays in cache
+
+        Returns:
+            out, filled with scores
+        """
+        weights, bias = self._linear_params()
+        n_samples = len(embeddings)
+        if out is None:
+            out = np.empty(n_samples, dtype=np.float32)
+
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            chunk = out[start:stop]
+            np.matmul(embeddings[start:stop], weights, out=chunk)
+            chunk += bias
+            _sigmoid_(chunk)
+
+        return out
 
     def predict(
         self,
         all_embeddings: np.ndarray,
-        batch_size: int = 15000
+        batch_size: int = 15000,
+        valid_mask: Optional[np.ndarray] = None,
     ) -> np.ndarray:
-        """Predict probability of positive class for all embeddings."""
-        if self._model is None:
-            raise ValueError("Must call fit() first")
-
-        n_samples = len(all_embeddings)
-        scores = np.zeros(n_samples, dtype=np.float32)
+        """
+        Predict probability of positive class for all embeddings.
 
-        for i in tqdm(range(0, n_samples, batch_size), desc="Classifying"):
-            end = min(i + batch_size, n_samples)
-            batch = all_embeddings[i:end]
+        Args:
+            all_embeddings: Embeddings to score, shape (N, C)
+            batch_size: Rows gathered per batch when valid_mask is given
+            valid_mask: Optional (N,) mask of rows with data; other rows
+                (e.g. nodata pixels) are not scored and get 0
+        """
+        if valid_mask is None:
+            return self.score_pixels(all_embeddings)
 
-            batch_scaled = self._scaler.transform(batch)
-            probs = self._model.predict_proba(batch_scaled)
-            scores[i:end] = probs[:, 1]
+        scores = np.zeros(len(all_embeddings), dtype=np.float32)
+        valid_idx = np.flatnonzero(valid_mask)
+        for i in range(0, len(valid_idx), batch_size):
+            idx = valid_idx[i:i + batch_size]
+            scores[idx] = self.score_pixels(_take_rows(all_embeddings, idx))
 
         return scores
 
@@ -110,6 +190,23 @@ class ClassifierMethod:
         return instance
 
 
+def _mc_dropout_forward(layers: nn.Sequential, x: torch.Tensor) -> torch.Tensor:
+    """
+    Run layers with dropout active. Masks are drawn by thresholding
+    torch.rand, which is several times faster on CPU than nn.Dropout's
+    Bernoulli sampling; the distribution and scaling are the same.
+    """
+    for layer in layers:
+        if isinstance(layer, nn.Dropout) and layer.p > 0:
+            keep = 1.0 - layer.p
+            # Reuse the uniform draws as the 0/1 mask and the output buffer
+            mask = torch.rand(x.shape, device=x.device).lt_(keep)
+            x = mask.mul_(x).mul_(1.0 / keep)
+        else:
+            x = layer(x)
+    return x
+
+
 class MLPNetwork(nn.Module):
     """Simple MLP with dropout for MC Dropout uncertainty estimation."""
 
@@ -239,9 +336,12 @@ class MLPClassifierMethod:
         self,
         all_embeddings: np.ndarray,
         batch_size: int = 15000,
+        valid_mask: Optional[np.ndarray] = None,
     ) -> np.ndarray:
         """Predict probability of positive class (no uncertainty)."""
-        scores, _ = self.predict_with_uncertainty(all_embeddings, batch_size, n_samples=1)
+        scores, _ = self.predict_with_uncertainty(
+            all_embeddings, batch_size, n_samples=1, valid_mask=valid_mask
+        )
         return scores
 
     def predict_with_uncertainty(
@@ -249,6 +349,7 @@ class MLPClassifierMethod:
         all_embeddings: np.ndarray,
         batch_size: int = 15000,
         n_samples: int = 30,
+        valid_mask: Optional[np.ndarray] = None,
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Predict with MC Dropout uncertainty estimation.
@@ -257,6 +358,8 @@ class MLPClassifierMethod:
             all_embeddings: Embeddings to predict on
             batch_size: Batch size for prediction
             n_samples: Number of MC Dropout forward passes
+            valid_mask: Optional (N,) mask of rows with data; other rows
+                (e.g. nodata pixels) are not scored and get 0
 
         Returns:
             scores: Mean probability of positive class
@@ -266,26 +369,58 @@ class MLPClassifierMethod:
             raise ValueError("Must call fit() first")
 
         n_total = len(all_embeddings)
-        all_preds = np.zeros((n_samples, n_total), dtype=np.float32)
+        if valid_mask is None:
+            valid_idx = np.arange(n_total)
+        else:
+            valid_idx = np.flatnonzero(valid_mask)
+        n_valid = len(valid_idx)
 
-        # Keep model in training mode to enable dropout
-        self._model.train()
+        scores = np.zeros(n_total, dtype=np.float32)
+        uncertainty = np.zeros(n_total, dtype=np.float32)
+
+        # Dropout only follows the first hidden layer, so its activations are
+        # computed once per batch and shared by all MC passes. Dropout is
+        # applied by _mc_dropout_forward regardless of the module's mode.
+        first_layer = self._model.layers[:2]
+        dropout_layers = self._model.layers[2:]
 
         with torch.no_grad():
-            for sample_idx in range(n_samples):
-                for i in range(0, n_total, batch_size):
-                    end = min(i + batch_size, n_total)
+            for i in range(0, n_valid, batch_size):
+                end = min(i + batch_size, n_valid)
+                if valid_mask is None:
+                    rows = slice(i, end)
                     batch = all_embeddings[i:end]
-
-                    batch_scaled = self._scaler.transform(batch)
-                    batch_tensor = torch.tensor(batch_scaled, dtype=torch.float32).to(self.device)
-
-                    preds = self._model(batch_tensor).cpu().numpy()
-                    all_preds[sample_idx, i:end] = preds
-
-        # Compute mean and std across MC samples
-        scores = all_preds.mean(axis=0)
-        uncertainty = all_preds.std(axis=0)
+                else:
+                    rows = valid_idx[i:end]
+                    batch = _take_rows(all_embeddings, rows)
+
+                batch_tensor = torch.as_tensor(
+                    self._scaler.transform(batch), dtype=torch.float32, device=self.device
+                )
+                hidden = first_layer(batch_tensor)
+                passes_per_forward = max(
+                    1, min(n_samples, MC_FORWARD_ELEMENTS // (len(batch) * hidden.shape[-1]))
+                )
+
+                # Running mean and sum of squared deviations over passes,
+                # merged group by group (Chan et al.)
+                count = 0
+                mean = torch.zeros(len(batch), device=self.device)
+                m2 = torch.zeros(len(batch), device=self.device)
+                for done in range(0, n_samples, passes_per_forward):
+                    k = min(passes_per_forward, n_samples - done)
+                    preds = _mc_dropout_forward(dropout_layers, hidden.expand(k, -1, -1)).squeeze(-1)
+
+                    group_mean = preds.mean(dim=0)
+                    group_m2 = ((preds - group_mean) ** 2).sum(dim=0)
+                    delta = group_mean - mean
+                    total = count + k
+                    mean += delta * (k / total)
+                    m2 += group_m2 + delta ** 2 * (count * k / total)
+                    count = total
+
+                scores[rows] = mean.cpu().numpy()
+                uncertainty[rows] = (m2 / count).sqrt().cpu().numpy()
 
         return scores, uncertainty
 
@@ -0,0 +1,149 @@
+"""
+Bounded in-memory cache of loaded classifiers for long-running processes.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CacheEntry:
+    model: Any
+    mtime_ns: int
+    n_bytes: int
+
+
+class ModelCache:
+    """
+    LRU cache of loaded models keyed by e.g. (species_key, model_type).
+
+    Entries are evicted least-recently-used first once either the entry or
+    byte budget is exceeded. The size of a model is estimated from its file
+    size on disk. An entry is reloaded when its model file's mtime changes,
+    so retrained models are picked up without restarting the process.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = 64,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of resident models (None = unbounded)
+            max_bytes: Maximum total size of resident models (None = unbounded)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: OrderedDict[Hashable, _CacheEntry] = OrderedDict()
+        self._n_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(
+        self,
+        key: Hashable,
+        path: Union[str, Path],
+        loader: Callable[[Path], Any],
+    ) -> Any:
+        """
+        Return the model for key, loading it from path on a miss.
+
+        Args:
+            key: Cache key, e.g. (species_key, model_type)
+            path: Model file; its mtime is checked on every lookup
+            loader: Function that loads the model from path
+        """
+        path = Path(path)
+        stat = path.stat()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.mtime_ns == stat.st_mtime_ns:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.model
+                # Model file changed on disk, drop the stale copy
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+
+        # Load outside the lock so other keys are not blocked on disk I/O
+        model = loader(path)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(model, stat.st_mtime_ns, stat.st_size)
+            self._n_bytes += stat.st_size
+            self._evict()
+
+        return model
+
+    def resize(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        """Change the budgets, evicting entries if they no longer fit."""
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """Drop all resident models."""
+        with self._lock:
+            self._entries.clear()
+            self._n_bytes = 0
+
+    def stats(self) -> dict:
+        """Cache counters and current usage."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._n_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._n_bytes -= entry.n_bytes
+
+    def _over_budget(self) -> bool:
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        if self.max_bytes is not None and self._n_bytes > self.max_bytes:
+            return True
+        return False
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it alone exceeds the byte budget
+        while len(self._entries) > 1 and self._over_budget():
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+            logger.debug(f"Evicted model {key}")
@@ -4,15 +4,20 @@ Main pipeline for finding candidate locations.
 
 import json
 import logging
+import tempfile
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Literal, Optional
 
 import numpy as np
 import rasterio
+import rasterio.shutil
+from rasterio.windows import Window
 
 from .gbif import get_species_info, fetch_occurrences
-from .embeddings import EmbeddingMosaic
+from .store import NameCache, OccurrenceStore
+from .embeddings import EmbeddingMosaic, Storage
 from .methods import ClassifierMethod
 
 logger = logging.getLogger(__name__)
@@ -30,6 +35,303 @@ REGIONS = {
 NEGATIVE_RATIO = 5
 
 
+# Probability rasters mark nodata (missing tiles, empty pixels) in an
+# internal mask band rather than with a nodata value, since every float and
+# uint8 value is a valid score.
+#
+# Probability raster layout:
+# - gtiff: untiled, uncompressed float32 GeoTIFF
+# - cog: cloud-optimized GeoTIFF with compressed 512x512 tiles and internal
+#   overviews, so map clients can read just the window and zoom they need
+RasterFormat = Literal["gtiff", "cog"]
+
+RASTER_BLOCK_SIZE = 512
+
+# How candidates are chosen when more than max_points pass the threshold:
+# - top: the highest scores
+# - random: a uniform (seeded) subset
+Selection = Literal["top", "random"]
+
+# Approximate length of one degree of latitude, for candidate spacing
+METERS_PER_DEGREE = 111_320
+
+# Pixels examined per step when selecting candidates, so a memory-mapped
+# score map (or its spilled candidates) is never read in full
+_CANDIDATE_CHUNK = 1 << 20
+
+# Candidate features formatted per write, and their JSON (as json.dumps
+# would produce it: floats use repr)
+_GEOJSON_CHUNK = 10000
+_FEATURE_TEMPLATE = (
+    '{"type": "Feature", "properties": {"probability": %r}, '
+    '"geometry": {"type": "Point", "coordinates": [%r, %r]}}'
+)
+_COG_OPTIONS = {
+    "COMPRESS": "DEFLATE",
+    "PREDICTOR": "YES",
+    "BLOCKSIZE": RASTER_BLOCK_SIZE,
+    "OVERVIEWS": "AUTO",
+    "RESAMPLING": "AVERAGE",
+}
+
+
+def _raster_profile(
+    height: int,
+    width: int,
+    transform: rasterio.transform.Affine,
+    dtype=np.float32,
+    tiled: bool = False,
+) -> dict:
+    """rasterio creation options for a probability GeoTIFF."""
+    profile = {
+        "driver": "GTiff",
+        "height": height,
+        "width": width,
+        "count": 1,
+        "dtype": dtype,
+        "crs": "EPSG:4326",
+        "transform": transform,
+    }
+    if tiled:
+        profile.update(tiled=True, blockxsize=RASTER_BLOCK_SIZE, blockysize=RASTER_BLOCK_SIZE)
+    return profile
+
+
+@contextmanager
+def _raster_writer(
+    path: Path,
+    height: int,
+    width: int,
+    transform: rasterio.transform.Affine,
+    raster_format: RasterFormat = "gtiff",
+    dtype=np.float32,
+) -> Iterator[rasterio.io.DatasetWriter]:
+    """
+    Open a single-band GeoTIFF for (windowed) writing.
+
+    The COG driver can only copy a finished raster, so for "cog" the data
+    goes to a tiled working file next to path that is converted on close
+    (with its mask band, see _probability_writer).
+    """
+    working = path if raster_format == "gtiff" else path.with_name(f".{path.stem}.partial.tif")
+    profile = _raster_profile(height, width, transform, dtype=dtype, tiled=raster_format == "cog")
+    try:
+        with rasterio.open(working, "w", **profile) as dst:
+            yield dst
+        if raster_format == "cog":
+            rasterio.shutil.copy(working, path, driver="COG", **_COG_OPTIONS)
+    finally:
+        if working != path:
+            working.unlink(missing_ok=True)
+
+
+def _to_uint8(scores: np.ndarray) -> np.ndarray:
+    """Quantize [0, 1] scores to 0-255 (read back with the band scale 1/255)."""
+    return np.rint(scores * 255).astype(np.uint8)
+
+
+@contextmanager
+def _probability_writer(
+    output_dir: Path,
+    height: int,
+    width: int,
+    transform: rasterio.transform.Affine,
+    raster_format: RasterFormat = "gtiff",
+    uint8: bool = False,
+) -> Iterator[Callable[[np.ndarray, Optional[Window], Optional[np.ndarray]], None]]:
+    """
+    Open probability.tif (and probability_uint8.tif if uint8) in output_dir.
+
+    Yields write(scores, window=None, valid=None), which writes a block of
+    scores to the given window of every output raster. If valid (a bool
+    array shaped like scores) is given, it goes to the rasters' mask band;
+    once any block has a mask, windows never written stay masked.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with ExitStack() as stack:
+        float_dst = stack.enter_context(_raster_writer(
+            output_dir / "probability.tif", height, width, transform, raster_format
+        ))
+        uint8_dst = None
+        if uint8:
+            uint8_dst = stack.enter_context(_raster_writer(
+                output_dir / "probability_uint8.tif", height, width, transform, raster_format,
+                dtype=np.uint8,
+            ))
+            uint8_dst.scales = (1 / 255,)
+
+        def write(scores: np.ndarray, window: Optional[Window] = None, valid: Optional[np.ndarray] = None) -> None:
+            mask = None if valid is None else np.where(valid, np.uint8(255), np.uint8(0))
+            float_dst.write(scores, 1, window=window)
+            if mask is not None:
+                float_dst.write_mask(mask, window=window)
+            if uint8_dst is not None:
+                uint8_dst.write(_to_uint8(scores), 1, window=window)
+                if mask is not None:
+                    uint8_dst.write_mask(mask, window=window)
+
+        yield write
+
+
+@dataclass
+class CandidatePixels:
+    """
+    Pixels scoring at least threshold, collected while a map is scored.
+
+    indices are flat (row * W + col) pixel indices; both arrays may be
+    memmaps over temporary files.
+    """
+
+    threshold: float
+    indices: np.ndarray  # int64
+    probabilities: np.ndarray  # float32
+
+
+def _smallest(keys: np.ndarray, indices: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k smallest keys; ties go to the smaller pixel index, so the choice is order-independent."""
+    if len(keys) <= k:
+        return np.arange(len(keys))
+    kth = np.partition(keys, k - 1)[k - 1]
+    below = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)
+    ties = ties[np.argsort(indices[ties], kind="stable")[:k - len(below)]]
+    return np.concatenate([below, ties])
+
+
+def _random_keys(indices: np.ndarray, seed: int) -> np.ndarray:
+    """
+    Uniform pseudo-random uint64 key per pixel index (splitmix64 of index and seed).
+
+    Keys depend only on the pixel and the seed, not on the order pixels are
+    visited in, so the same seed picks the same subset from any source.
+    """
+    x = indices.astype(np.uint64) + np.uint64(seed * 0x9E3779B97F4A7C15 % 2**64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _ranges(starts: np.ndarray, stops: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Every position in [starts[i], stops[i]), concatenated over i, and the i of each."""
+    lengths = stops - starts
+    segment = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return starts[segment] + offsets, segment
+
+
+def _distinct(values: np.ndarray, n: int) -> np.ndarray:
+    """Sorted distinct values of an array of integers in [0, n]."""
+    if len(values) * 8 < n:
+        return np.unique(values)
+    seen = np.zeros(n + 1, dtype=bool)
+    seen[values] = True
+    return np.flatnonzero(seen)
+
+
+def _greedy_spacing(x: np.ndarray, y: np.ndarray, min_spacing: float) -> np.ndarray:
+    """
+    Greedily pick points in array order, skipping any closer than min_spacing to an earlier pick.
+
+    Gives the same picks as a sequential loop, in vectorized rounds. Points
+    are binned into square cells with a diagonal of min_spacing, so a cell
+    holds at most one pick and a point can only be too close to points in
+    the 5x5 cells around it (corners excluded). Each round, every undecided
+    cell offers its first remaining point; a cell whose point comes before
+    those of all undecided neighbours is picked, and the points of nearby
+    cells too close to it are dropped. Only cells next to a change are
+    looked at again, so a round costs about as much as what it decides.
+
+    Returns:
+        Sorted indices of the picked points
+    """
+    n = len(x)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Cell keys, offset so that neighbouring keys never wrap around a row
+    cell_size = min_spacing / np.sqrt(2)
+    cell_x = np.floor((x - x.min()) / cell_size).astype(np.int64) + 2
+    cell_y = np.floor((y - y.min()) / cell_size).astype(np.int64) + 2
+    row_stride = int(cell_x.max()) + 3
+    cell_key = cell_y * row_stride + cell_x
+
+    # Points grouped by cell, in array order within a cell
+    by_cell = np.argsort(cell_key, kind="stable")
+    sorted_keys = cell_key[by_cell]
+    start = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    end = np.r_[start[1:], n]
+    cells = sorted_keys[start]
+    n_cells = len(cells)
+
+    def neighbours(c: np.ndarray) -> np.ndarray:
+        """(len(c), 20) occupied cells near each of c; n_cells where there is none."""
+        result = np.empty((len(c), 20), dtype=np.int64)
+        column = 0
+        for dy in range(-2, 3):
+            # Keys along a row are consecutive, so one search per row suffices
+            target = cells[c] + dy * row_stride - 2
+            pos = np.searchsorted(cells, target)
+            for dx in range(-2, 3):
+                found = cells[np.minimum(pos, n_cells - 1)] == target
+                if 0 < abs(dx) + abs(dy) < 4:
+                    result[:, column] = np.where(found, pos, n_cells)
+                    column += 1
+                pos += found
+                target += 1
+        return result
+
+    none = np.iinfo(np.int64).max
+    # First remaining point of each undecided cell (none once decided), with
+    # a sentinel entry for "no cell"; first[c] is its position in by_cell
+    current = np.full(n_cells + 1, none)
+    current[:n_cells] = by_cell[start]
+    first = start.copy()
+    alive = np.ones(n, dtype=bool)
+    cell_xs, cell_ys = x[by_cell], y[by_cell]
+    min_spacing_sq = min_spacing * min_spacing
+
+    picks = []
+    dirty = np.arange(n_cells)
+    while dirty.size:
+        dirty = dirty[current[dirty] != none]
+        near = neighbours(dirty)
+        is_ready = current[dirty] < current[near].min(axis=1, initial=none)
+        ready, near = dirty[is_ready], near[is_ready]
+        points = current[ready]
+        current[ready] = none
+        picks.append(points)
+
+        # Drop points of undecided nearby cells that are too close to a new pick
+        pick = np.repeat(points, near.shape[1])
+        near = near.ravel()
+        undecided = current[near] != none
+        near, pick = near[undecided], pick[undecided]
+        pos, segment = _ranges(first[near], end[near])
+        pick = pick[segment]
+        too_close = (cell_xs[pos] - x[pick]) ** 2 + (cell_ys[pos] - y[pick]) ** 2 < min_spacing_sq
+        alive[pos[too_close]] = False
+
+        # Move cells whose first point was dropped on to their next remaining one
+        hit = _distinct(near, n_cells)
+        hit = hit[~alive[first[hit]]]
+        pos, segment = _ranges(first[hit], end[hit])
+        remaining = np.flatnonzero(alive[pos])
+        segment = segment[remaining]
+        leading = np.flatnonzero(np.r_[True, segment[1:] != segment[:-1]]) if len(segment) else segment
+        left = hit[segment[leading]]
+        current[hit] = none
+        first[left] = pos[remaining[leading]]
+        current[left] = by_cell[first[left]]
+
+        # Only cells next to a change can become ready
+        changed = np.concatenate([ready, hit])
+        dirty = _distinct(np.concatenate([changed, neighbours(changed).ravel()]), n_cells)
+        dirty = dirty[dirty < n_cells]
+
+    return np.sort(np.concatenate(picks))
+
+
 @dataclass
 class PredictionResult:
     """Container for prediction results."""
@@ -38,80 +340,344 @@ class PredictionResult:
     taxon_key: int
     n_occurrences: int
     n_background: int
-    scores: np.ndarray  # (H, W) probability map
+    scores: np.ndarray  # (H, W) probability map; a disk-backed memmap when streamed
     transform: rasterio.transform.Affine
     bbox: tuple[float, float, float, float]
+    # (H, W) pixels that had an embedding, masked out of the saved rasters
+    valid_mask: Optional[np.ndarray] = None
+    # Collected while streaming, so candidates() need not rescan scores
+    candidate_pixels: Optional[CandidatePixels] = None
+    # Number of features in the last candidates.geojson written
+    n_candidates: Optional[int] = None
+
+    def _candidate_chunks(self, threshold: float) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        Flat indices and float64 scores of the pixels >= threshold, a bounded chunk at a time.
+
+        Read from candidate_pixels when they were collected at or below
+        threshold, otherwise from scores in row blocks.
+        """
+        collected = self.candidate_pixels
+        if collected is not None and threshold >= collected.threshold:
+            for start in range(0, len(collected.indices), _CANDIDATE_CHUNK):
+                indices = np.asarray(collected.indices[start:start + _CANDIDATE_CHUNK])
+                probabilities = np.asarray(collected.probabilities[start:start + _CANDIDATE_CHUNK], dtype=np.float64)
+                keep = probabilities >= threshold
+                yield indices[keep], probabilities[keep]
+            return
+
+        h, w = self.scores.shape
+        block_rows = max(1, _CANDIDATE_CHUNK // w)
+        for row0 in range(0, h, block_rows):
+            block = np.asarray(self.scores[row0:row0 + block_rows])
+            rows, cols = np.nonzero(block >= threshold)
+            yield (rows + row0) * w + cols, np.asarray(block[rows, cols], dtype=np.float64)
+
+    def candidates(
+        self,
+        threshold: float = 0.5,
+        max_points: Optional[int] = 5000,
+        selection: Selection = "top",
+        min_spacing_m: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        High-scoring pixel centers as arrays.
+
+        Without min_spacing_m, the map is read in chunks and only the best
+        max_points candidates so far are kept, so memory does not grow with
+        the map; thinning needs every pixel that passes the threshold.
+
+        Args:
+            threshold: Minimum probability
+            max_points: Maximum number of candidates (None = all)
+            selection: Which candidates to keep when more than max_points
+                pass: "top" scores or a seeded "random" subset
+            min_spacing_m: If given, thin candidates so no two are closer than
+                this many meters, preferring higher scores
+            seed: Random seed for selection="random"
+
+        Returns:
+            (lons, lats, probabilities), sorted by probability ascending so
+            high values are rendered on top
+        """
+        if selection == "random":
+            seed = int(np.random.default_rng(seed).integers(2**63))
+
+        def best(indices: np.ndarray, probabilities: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+            keys = -probabilities if selection == "top" else _random_keys(indices, seed)
+            idx = _smallest(keys, indices, k)
+            return indices[idx], probabilities[idx]
+
+        def concatenate(chunks: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+            return (
+                np.concatenate([np.empty(0, dtype=np.int64)] + [indices for indices, _ in chunks]),
+                np.concatenate([np.empty(0)] + [probabilities for _, probabilities in chunks]),
+            )
+
+        selected = []
+        for chunk in self._candidate_chunks(threshold):
+            selected.append(chunk)
+            if max_points is not None and not min_spacing_m:
+                selected = [best(*concatenate(selected), max_points)]
+        indices, probabilities = concatenate(selected)
+
+        if min_spacing_m:
+            limit = max_points if selection == "top" else None
+            idx = self._thin(indices, probabilities, min_spacing_m, limit)
+            indices, probabilities = indices[idx], probabilities[idx]
+            if max_points is not None:
+                indices, probabilities = best(indices, probabilities, max_points)
+
+        order = np.lexsort((indices, probabilities))
+        rows, cols = np.divmod(indices[order], self.scores.shape[1])
+        lons, lats = self.transform * (cols + 0.5, rows + 0.5)
+        return lons, lats, probabilities[order]
+
+    def _thin(
+        self,
+        indices: np.ndarray,
+        probabilities: np.ndarray,
+        min_spacing_m: float,
+        limit: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Greedily pick candidates best-first, skipping any within min_spacing_m of one already picked.
+
+        Ties go to the lower pixel index. With a limit, only the first limit
+        picks are made.
+
+        Returns:
+            Positions of the picked candidates, best first
+        """
+        # Local equirectangular projection, in meters
+        rows, cols = np.divmod(indices, self.scores.shape[1])
+        lons, lats = self.transform * (cols + 0.5, rows + 0.5)
+        mid_lat = np.radians((self.bbox[1] + self.bbox[3]) / 2)
+        x = lons * (METERS_PER_DEGREE * np.cos(mid_lat))
+        y = lats * METERS_PER_DEGREE
+
+        by_rank = np.lexsort((indices, -probabilities))
+        x, y = x[by_rank], y[by_rank]
+
+        # Whether a candidate is picked depends only on better ones, so the
+        # first limit picks usually come from a short prefix of the ranking
+        picked = None
+        if limit is not None and 4 * limit < len(by_rank):
+            picked = _greedy_spacing(x[:4 * limit], y[:4 * limit], min_spacing_m)
+        if picked is None or len(picked) < limit:
+            picked = _greedy_spacing(x, y, min_spacing_m)
+        return by_rank[picked[:limit]]
+
+    def _geojson_metadata(
+        self,
+        n_candidates: int,
+        threshold: float,
+        selection: Selection,
+        min_spacing_m: Optional[float],
+        seed: Optional[int],
+    ) -> dict:
+        return {
+            "species": self.species_name,
+            "taxon_key": self.taxon_key,
+            "n_occurrences": self.n_occurrences,
+            "n_candidates": n_candidates,
+            "threshold": threshold,
+            "selection": selection,
+            "min_spacing_m": min_spacing_m,
+            "seed": seed,
+            "bbox": list(self.bbox),
+        }
 
     def to_geojson(
         self,
         threshold: float = 0.5,
-        max_points: int = 5000
+        max_points: Optional[int] = 5000,
+        selection: Selection = "top",
+        min_spacing_m: Optional[float] = None,
+        seed: Optional[int] = None,
     ) -> dict:
-        """Convert high-scoring pixels to GeoJSON."""
-        rows, cols = np.where(self.scores >= threshold)
-
-        # Subsample if too many points
-        if len(rows) > max_points:
-            idx = np.random.choice(len(rows), max_points, replace=False)
-            rows, cols = rows[idx], cols[idx]
-
-        features = []
-        for row, col in zip(rows, cols):
-            lon, lat = rasterio.transform.xy(self.transform, row, col)
-            features.append({
+        """Convert high-scoring pixels to GeoJSON (see candidates() for the selection)."""
+        lons, lats, probabilities = self.candidates(threshold, max_points, selection, min_spacing_m, seed)
+        features = [
+            {
                 "type": "Feature",
-                "properties": {"probability": float(self.scores[row, col])},
+                "properties": {"probability": probability},
                 "geometry": {"type": "Point", "coordinates": [lon, lat]}
-            })
-
-        # Sort by probability (ascending, so high values rendered on top)
-        features.sort(key=lambda f: f["properties"]["probability"])
+            }
+            for lon, lat, probability in zip(lons.tolist(), lats.tolist(), probabilities.tolist())
+        ]
 
         return {
             "type": "FeatureCollection",
             "features": features,
-            "metadata": {
-                "species": self.species_name,
-                "taxon_key": self.taxon_key,
-                "n_occurrences": self.n_occurrences,
-                "n_candidates": len(features),
-                "threshold": threshold,
-                "bbox": list(self.bbox),
-            }
+            "metadata": self._geojson_metadata(len(features), threshold, selection, min_spacing_m, seed),
         }
 
-    def save(self, output_dir: Path, threshold: float = 0.5) -> dict[str, Path]:
-        """Save results to files."""
+    def write_geojson(
+        self,
+        path: Path,
+        threshold: float = 0.5,
+        max_points: Optional[int] = 5000,
+        selection: Selection = "top",
+        min_spacing_m: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> int:
+        """
+        Write the to_geojson() collection to path without building it in memory.
+
+        Features are formatted in chunks straight from the candidate arrays;
+        the output is byte-identical to json.dump(to_geojson()).
+
+        Returns:
+            Number of features written
+        """
+        lons, lats, probabilities = self.candidates(threshold, max_points, selection, min_spacing_m, seed)
+        n_candidates = len(probabilities)
+
+        with open(path, "w") as f:
+            f.write('{"type": "FeatureCollection", "features": [')
+            for start in range(0, n_candidates, _GEOJSON_CHUNK):
+                stop = start + _GEOJSON_CHUNK
+                if start:
+                    f.write(", ")
+                f.write(", ".join(
+                    _FEATURE_TEMPLATE % feature
+                    for feature in zip(
+                        probabilities[start:stop].tolist(),
+                        lons[start:stop].tolist(),
+                        lats[start:stop].tolist(),
+                    )
+                ))
+            f.write('], "metadata": ')
+            f.write(json.dumps(self._geojson_metadata(n_candidates, threshold, selection, min_spacing_m, seed)))
+            f.write("}")
+
+        return n_candidates
+
+    def save(
+        self,
+        output_dir: Path,
+        threshold: float = 0.5,
+        raster_format: RasterFormat = "gtiff",
+        uint8: bool = False,
+        min_spacing_m: Optional[float] = None,
+        selection: Selection = "top",
+        seed: Optional[int] = None,
+    ) -> dict[str, Path]:
+        """
+        Save results to files.
+
+        Args:
+            output_dir: Directory to write into
+            threshold: Minimum probability for candidates.geojson
+            raster_format: Layout of probability.tif ("gtiff" or "cog")
+            uint8: Also write probability_uint8.tif, scores quantized to 0-255
+            min_spacing_m: Minimum distance between candidates, in meters
+            selection: Which candidates to keep ("top" or "random", see candidates())
+            seed: Random seed for selection="random"
+        """
+        output_dir = Path(output_dir)
+        paths = self.save_rasters(output_dir, raster_format=raster_format, uint8=uint8)
+        paths.update(self.save_candidates(
+            output_dir, threshold=threshold, min_spacing_m=min_spacing_m, selection=selection, seed=seed,
+        ))
+        return paths
+
+    def save_rasters(
+        self,
+        output_dir: Path,
+        raster_format: RasterFormat = "gtiff",
+        uint8: bool = False,
+    ) -> dict[str, Path]:
+        """Save the probability map as probability.tif (and probability_uint8.tif), masked by valid_mask."""
+        output_dir = Path(output_dir)
+        height, width = self.scores.shape
+        with _probability_writer(output_dir, height, width, self.transform, raster_format, uint8) as write:
+            write(self.scores, valid=self.valid_mask)
+        return _log_rasters(output_dir, uint8)
+
+    def save_candidates(
+        self,
+        output_dir: Path,
+        threshold: float = 0.5,
+        min_spacing_m: Optional[float] = None,
+        selection: Selection = "top",
+        seed: Optional[int] = None,
+    ) -> dict[str, Path]:
+        """Save the selected candidate pixels as candidates.geojson (see candidates())."""
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        paths = {}
-
-        # Save probability raster as GeoTIFF
-        tiff_path = output_dir / "probability.tif"
-        with rasterio.open(
-            tiff_path, "w",
-            driver="GTiff",
-            height=self.scores.shape[0],
-            width=self.scores.shape[1],
-            count=1,
-            dtype=np.float32,
-            crs="EPSG:4326",
-            transform=self.transform,
-        ) as dst:
-            dst.write(self.scores, 1)
-        paths["raster"] = tiff_path
-        logger.info(f"Saved probability raster: {tiff_path}")
-
-        # Save candidates as GeoJSON
-        geojson = self.to_geojson(threshold=threshold)
         geojson_path = output_dir / "candidates.geojson"
-        with open(geojson_path, "w") as f:
-            json.dump(geojson, f)
-        paths["candidates"] = geojson_path
-        logger.info(f"Saved {len(geojson['features'])} candidates: {geojson_path}")
+        self.n_candidates = self.write_geojson(
+            geojson_path, threshold=threshold, selection=selection, min_spacing_m=min_spacing_m, seed=seed,
+        )
+        logger.info(f"Saved {self.n_candidates} candidates: {geojson_path}")
 
-        return paths
+        return {"candidates": geojson_path}
+
+
+def _log_rasters(output_dir: Path, uint8: bool) -> dict[str, Path]:
+    paths = {"raster": output_dir / "probability.tif"}
+    if uint8:
+        paths["raster_uint8"] = output_dir / "probability_uint8.tif"
+    for path in paths.values():
+        logger.info(f"Saved probability raster: {path}")
+    return paths
+
+
+def sample_background_pixels(
+    mosaic: EmbeddingMosaic,
+    n_samples: int,
+    exclude_coords: list[tuple[float, float]],
+    rng: np.random.Generator,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Draw distinct random valid pixels, avoiding pixels that contain excluded coordinates.
+
+    All samples are drawn in a single rng.choice over the ranks of the mosaic's
+    valid pixels, so the result is reproducible for a given generator state,
+    and is the same whether or not the mosaic built its valid-pixel index
+    (see EmbeddingMosaic.valid_indices_at), so streamed and in-memory runs
+    train on the same background. Fewer than n_samples pixels are returned
+    only if the mosaic runs out of valid pixels.
+
+    Args:
+        mosaic: Loaded embedding mosaic
+        n_samples: Number of background pixels to draw
+        exclude_coords: Coordinates to exclude (occurrence locations)
+        rng: Random generator
+
+    Returns:
+        Tuple of (rows, cols) arrays
+    """
+    h, w, _ = mosaic.shape
+    n_valid = mosaic.n_valid
+    excluded = _excluded_pixels(mosaic, exclude_coords)
+
+    # Over-draw by the number of excluded pixels, then drop any that were hit
+    n_draw = min(n_samples + len(excluded), n_valid)
+    drawn = mosaic.valid_indices_at(rng.choice(n_valid, size=n_draw, replace=False))
+    if len(excluded):
+        drawn = drawn[~np.isin(drawn, excluded)]
+    drawn = drawn[:n_samples]
+
+    if len(drawn) < n_samples:
+        logger.warning(f"  Only {len(drawn)} background pixels available (requested {n_samples})")
+
+    return np.divmod(drawn, w)
+
+
+def _excluded_pixels(mosaic: EmbeddingMosaic, exclude_coords: list[tuple[float, float]]) -> np.ndarray:
+    """Sorted unique flat indices of the in-bounds pixels containing exclude_coords."""
+    if not exclude_coords:
+        return np.empty(0, dtype=np.int64)
+    h, w, _ = mosaic.shape
+    lons, lats = np.asarray(exclude_coords, dtype=np.float64).T
+    rows, cols = mosaic.coords_to_pixels(lons, lats)
+    inside = (rows >= 0) & (rows < h) & (cols >= 0) & (cols < w)
+    return np.unique(rows[inside] * w + cols[inside])
 
 
 def sample_background(
@@ -133,32 +699,9 @@ def sample_background(
         Tuple of (embeddings array, coordinates list)
     """
     rng = np.random.default_rng(seed)
-    h, w, _ = mosaic.shape
-
-    # Get pixel indices of exclusions
-    exclude_pixels = set()
-    for lon, lat in exclude_coords:
-        row, col = mosaic.coords_to_pixel(lon, lat)
-        exclude_pixels.add((row, col))
-
-    coords = []
-    embeddings = []
-    attempts = 0
-    max_attempts = n_samples * 20
-
-    while len(coords) < n_samples and attempts < max_attempts:
-        row = rng.integers(0, h)
-        col = rng.integers(0, w)
-        if (row, col) not in exclude_pixels:
-            emb = mosaic.mosaic[row, col, :]
-            if not np.allclose(emb, 0):  # Skip empty pixels
-                lon, lat = mosaic.pixel_to_coords(row, col)
-                coords.append((lon, lat))
-                embeddings.append(emb)
-                exclude_pixels.add((row, col))
-        attempts += 1
-
-    return np.array(embeddings), coords
+    rows, cols = sample_background_pixels(mosaic, n_samples, exclude_coords, rng)
+    lons, lats = mosaic.pixels_to_coords(rows, cols)
+    return mosaic.mosaic[rows, cols], list(zip(lons.tolist(), lats.tolist()))
 
 
 def find_candidates(
@@ -167,6 +710,13 @@ def find_candidates(
     cache_dir: Path,
     output_dir: Optional[Path] = None,
     negative_ratio: int = NEGATIVE_RATIO,
+    storage: Storage = "dense",
+    occurrence_store: Optional[OccurrenceStore] = None,
+    name_cache: Optional[NameCache] = None,
+    max_memory: Optional[int] = None,
+    raster_format: RasterFormat = "gtiff",
+    uint8: bool = False,
+    min_spacing_m: Optional[float] = None,
 ) -> PredictionResult:
     """
     Find candidate locations for a species using a classifier.
@@ -180,6 +730,22 @@ def find_candidates(
         cache_dir: Directory containing Tessera embeddings
         output_dir: If provided, save results to this directory
         negative_ratio: Ratio of background samples to occurrences
+        storage: Mosaic storage mode; "quantized" or "mmap" keep the embeddings
+            as int8 and fit much larger regions in memory
+        occurrence_store: Local occurrence store; reruns are answered from it
+            instead of refetching from GBIF
+        name_cache: Persistent species name -> taxon key cache
+        max_memory: If given, stream instead: tiles are memory-mapped, the
+            mosaic is scored in blocks that fit this many bytes, and each block
+            is written straight into its window of probability.tif. Peak
+            memory then no longer grows with the bbox. Scores are returned as
+            a memmap backed by a temporary file. The background sample is
+            the same as without max_memory, so the scores are too.
+        raster_format: Layout of probability.tif; "cog" writes a tiled,
+            compressed cloud-optimized GeoTIFF with overviews
+        uint8: Also write probability_uint8.tif with scores quantized to 0-255
+        min_spacing_m: Minimum distance between saved candidates, in meters;
+            higher-scoring candidates win
 
     Returns:
         PredictionResult with probability scores and metadata
@@ -190,11 +756,11 @@ def find_candidates(
 
     # 1. Get species info and occurrences
     logger.info("\n[1/5] Fetching GBIF data...")
-    species_info = get_species_info(species_name)
+    species_info = get_species_info(species_name, name_cache)
     taxon_key = species_info["taxon_key"]
     logger.info(f"  Matched: {species_info['scientific_name']} (key: {taxon_key})")
 
-    occurrences = fetch_occurrences(taxon_key, bbox)
+    occurrences = fetch_occurrences(taxon_key, bbox, store=occurrence_store)
     n_occurrences = len(occurrences)
     logger.info(f"  Found {n_occurrences} occurrences in region")
 
@@ -203,7 +769,14 @@ def find_candidates(
 
     # 2. Load embedding mosaic
     logger.info("\n[2/5] Loading embedding mosaic...")
-    mosaic = EmbeddingMosaic(cache_dir, bbox)
+    streaming = max_memory is not None
+    if streaming:
+        # Blocks are read from memory-mapped tiles; the whole-mosaic valid
+        # index would grow with the bbox, so it is not built (background
+        # sampling counts valid pixels per row instead)
+        mosaic = EmbeddingMosaic(cache_dir, bbox, storage="mmap", index_valid=False)
+    else:
+        mosaic = EmbeddingMosaic(cache_dir, bbox, storage=storage)
     mosaic.load()
     h, w, c = mosaic.shape
     logger.info(f"  Mosaic shape: {h} x {w} x {c}")
@@ -219,9 +792,7 @@ def find_candidates(
     # 4. Sample background embeddings
     logger.info("\n[4/5] Sampling background embeddings...")
     n_background = len(positive_embeddings) * negative_ratio
-    negative_embeddings, neg_coords = sample_background(
-        mosaic, n_background, valid_coords
-    )
+    negative_embeddings, _ = sample_background(mosaic, n_background, valid_coords)
     logger.info(f"  Background samples: {len(negative_embeddings)}")
 
     # 5. Train classifier and predict
@@ -229,14 +800,28 @@ def find_candidates(
     classifier = ClassifierMethod()
     classifier.fit(positive_embeddings, negative_embeddings)
 
-    all_embeddings = mosaic.get_all_embeddings()
-    scores = classifier.predict(all_embeddings)
-    scores_map = scores.reshape(h, w)
+    candidate_pixels = valid_mask = None
+    if streaming and output_dir:
+        with _probability_writer(output_dir, h, w, mosaic.transform, raster_format, uint8) as write:
+            scores_map, candidate_pixels, stats = _score_streaming(
+                mosaic, classifier, max_memory, 0.5, write, Path(output_dir)
+            )
+        _log_rasters(Path(output_dir), uint8)
+        score_min, score_max, high_score = stats
+    elif streaming:
+        scores_map, candidate_pixels, stats = _score_streaming(mosaic, classifier, max_memory, 0.5)
+        score_min, score_max, high_score = stats
+    else:
+        # Nodata pixels (missing tiles, empty pixels) are skipped and scored 0
+        all_embeddings = mosaic.get_all_embeddings()
+        scores = classifier.predict(all_embeddings, valid_mask=mosaic.valid_mask.ravel())
+        scores_map = scores.reshape(h, w)
+        valid_mask = mosaic.valid_mask
+        score_min, score_max, high_score = scores.min(), scores.max(), (scores > 0.5).sum()
 
     # Log statistics
-    logger.info(f"\n  Score range: {scores.min():.3f} - {scores.max():.3f}")
-    high_score = (scores > 0.5).sum()
-    logger.info(f"  High probability pixels (>0.5): {high_score:,} ({100*high_score/len(scores):.1f}%)")
+    logger.info(f"\n  Score range: {score_min:.3f} - {score_max:.3f}")
+    logger.info(f"  High probability pixels (>0.5): {high_score:,} ({100*high_score/(h*w):.1f}%)")
 
     # Create result
     result = PredictionResult(
@@ -247,11 +832,18 @@ def find_candidates(
         scores=scores_map,
         transform=mosaic.transform,
         bbox=bbox,
+        valid_mask=valid_mask,
+        candidate_pixels=candidate_pixels,
     )
 
-    # Save if output directory specified
+    # Save if output directory specified; a streamed run has already written the raster
     if output_dir:
-        result.save(output_dir, threshold=0.5)
+        if streaming:
+            result.save_candidates(output_dir, threshold=0.5, min_spacing_m=min_spacing_m)
+        else:
+            result.save(
+                output_dir, threshold=0.5, raster_format=raster_format, uint8=uint8, min_spacing_m=min_spacing_m
+            )
 
         # Also save occurrences
         occ_geojson = {
@@ -275,3 +867,80 @@ def find_candidates(
     logger.info("=" * 60)
 
     return result
+
+
+def _score_streaming(
+    mosaic: EmbeddingMosaic,
+    classifier: ClassifierMethod,
+    max_memory: int,
+    candidate_threshold: float,
+    write: Optional[Callable[[np.ndarray, Optional[Window], Optional[np.ndarray]], None]] = None,
+    scratch_dir: Optional[Path] = None,
+) -> tuple[np.memmap, CandidatePixels, tuple[float, float, int]]:
+    """
+    Score the mosaic's present tiles block by block within a memory budget.
+
+    Each block is read from the memory-mapped tiles, scored (nodata pixels
+    get 0), passed to write with its window and valid mask (see
+    _probability_writer) and stored in a memmap backed by an anonymous
+    temporary file in scratch_dir. Blocks are bands of RASTER_BLOCK_SIZE
+    rows where the budget allows, so tiled rasters are written strip by
+    strip. Missing tiles are never read or scored; they stay 0 in the
+    memmap and masked in the written rasters. The pixels of each block
+    scoring at least candidate_threshold are appended to temporary files
+    too, so candidates can be selected without rescanning the map.
+
+    Returns:
+        (scores memmap (H, W), candidate pixels,
+        (min score, max score, pixels > 0.5))
+    """
+    h, w, c = mosaic.shape
+    # Dequantized block, the gathered valid rows, the nodata scan and the scores
+    bytes_per_pixel = 2 * c * 4 + c + 8
+    budget_pixels = max(1, max_memory // bytes_per_pixel)
+    windows = mosaic.tile_windows()
+    n_covered = sum(win.width * win.height for win in windows)
+    logger.info(
+        f"  Streaming {len(windows)} tiles ({100 * n_covered / (h * w):.0f}% of the bbox) "
+        f"in blocks of up to {budget_pixels:,} pixels"
+    )
+
+    scores = np.memmap(tempfile.TemporaryFile(dir=scratch_dir), dtype=np.float32, mode="w+", shape=(h, w))
+    index_file = tempfile.TemporaryFile(dir=scratch_dir)
+    probability_file = tempfile.TemporaryFile(dir=scratch_dir)
+    n_candidates = 0
+    # Pixels of missing tiles score 0
+    score_min = 0.0 if n_covered < h * w else np.inf
+    score_max, high_score = -np.inf, 0
+
+    for window, block, _ in mosaic.iter_tiles(max_pixels=budget_pixels, align=RASTER_BLOCK_SIZE):
+        block = block.reshape(-1, c)
+        valid = np.any(block != 0, axis=-1)
+        block_scores = classifier.predict(block, valid_mask=valid).reshape(window.height, window.width)
+
+        scores[window.toslices()] = block_scores
+        if write is not None:
+            write(block_scores, window, valid.reshape(window.height, window.width))
+        score_min = min(score_min, float(block_scores.min()))
+        score_max = max(score_max, float(block_scores.max()))
+        high_score += int((block_scores > 0.5).sum())
+
+        rows, cols = np.nonzero(block_scores >= candidate_threshold)
+        index_file.write(((rows + window.row_off) * w + cols + window.col_off).astype(np.int64).tobytes())
+        probability_file.write(block_scores[rows, cols].astype(np.float32).tobytes())
+        n_candidates += len(rows)
+
+    candidate_pixels = CandidatePixels(
+        threshold=candidate_threshold,
+        indices=_memmap_file(index_file, np.int64, n_candidates),
+        probabilities=_memmap_file(probability_file, np.float32, n_candidates),
+    )
+    return scores, candidate_pixels, (score_min, score_max, high_score)
+
+
+def _memmap_file(file, dtype, length: int) -> np.ndarray:
+    """Read-only memmap of length items written to an open file (an empty array if none)."""
+    file.flush()
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(file, dtype=dtype, mode="r", shape=(length,))
@@ -0,0 +1,277 @@
+"""
+Local SQLite stores for GBIF data: occurrences with a grid index for bbox
+queries, and resolved species names.
+"""
+
+import json
+import math
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+_OCCURRENCE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS occurrences (
+    taxon_key INTEGER NOT NULL,
+    gbif_id INTEGER NOT NULL,
+    lon REAL NOT NULL,
+    lat REAL NOT NULL,
+    cell_x INTEGER NOT NULL,
+    cell_y INTEGER NOT NULL,
+    PRIMARY KEY (taxon_key, gbif_id)
+);
+CREATE INDEX IF NOT EXISTS occurrences_cell ON occurrences (taxon_key, cell_x, cell_y);
+CREATE TABLE IF NOT EXISTS coverage (
+    taxon_key INTEGER NOT NULL,
+    min_lon REAL NOT NULL,
+    min_lat REAL NOT NULL,
+    max_lon REAL NOT NULL,
+    max_lat REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    n_records INTEGER NOT NULL,
+    PRIMARY KEY (taxon_key, min_lon, min_lat, max_lon, max_lat)
+);
+"""
+
+_NAME_SCHEMA = """
+CREATE TABLE IF NOT EXISTS species_names (
+    name TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    resolved_at REAL NOT NULL
+);
+"""
+
+
+class _SqliteStore:
+    """
+    SQLite file opened per operation, so one store can be shared across
+    threads and processes. The schema is created on first use.
+    """
+
+    _schema = ""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(self._schema)
+                self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+@dataclass
+class Coverage:
+    """A bounding box whose occurrences were fetched completely at fetched_at."""
+
+    taxon_key: int
+    bbox: tuple[float, float, float, float]
+    fetched_at: float  # Unix timestamp
+    n_records: int
+
+
+class OccurrenceStore(_SqliteStore):
+    """
+    Local copy of GBIF occurrences, keyed by taxon key.
+
+    Records are indexed on a regular lon/lat grid so bbox queries only touch
+    nearby cells. Each complete fetch is recorded as a coverage bbox with a
+    timestamp; a query is answered locally when a coverage contains its bbox.
+    """
+
+    _schema = _OCCURRENCE_SCHEMA
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        cell_size: float = 0.1,
+        max_age_days: float = 7.0,
+    ):
+        """
+        Args:
+            path: SQLite database file (created on first use)
+            cell_size: Grid cell size in degrees for the spatial index
+            max_age_days: Age after which a coverage is refreshed from GBIF
+        """
+        super().__init__(path)
+        self.cell_size = cell_size
+        self.max_age_days = max_age_days
+
+    def _cell(self, value: float) -> int:
+        return math.floor(value / self.cell_size)
+
+    def find_coverage(
+        self,
+        taxon_key: int,
+        bbox: tuple[float, float, float, float],
+    ) -> Optional[Coverage]:
+        """Most recent coverage for the taxon that contains bbox, if any."""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT min_lon, min_lat, max_lon, max_lat, fetched_at, n_records
+                FROM coverage
+                WHERE taxon_key = ? AND min_lon <= ? AND min_lat <= ? AND max_lon >= ? AND max_lat >= ?
+                ORDER BY fetched_at DESC
+                LIMIT 1
+                """,
+                (taxon_key, min_lon, min_lat, max_lon, max_lat),
+            ).fetchone()
+        if row is None:
+            return None
+        return Coverage(taxon_key, tuple(row[:4]), row[4], row[5])
+
+    def is_fresh(self, coverage: Coverage) -> bool:
+        """Whether a coverage is younger than max_age_days."""
+        return time.time() - coverage.fetched_at < self.max_age_days * 86400
+
+    def _bbox_filter(self, taxon_key: int, bbox: tuple[float, float, float, float]) -> tuple[str, list]:
+        """WHERE clause and parameters selecting a taxon's records inside bbox via the grid index."""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        sql = """
+            WHERE taxon_key = ?
+              AND cell_x BETWEEN ? AND ? AND cell_y BETWEEN ? AND ?
+              AND lon BETWEEN ? AND ? AND lat BETWEEN ? AND ?
+        """
+        params = [
+            taxon_key,
+            self._cell(min_lon), self._cell(max_lon),
+            self._cell(min_lat), self._cell(max_lat),
+            min_lon, max_lon, min_lat, max_lat,
+        ]
+        return sql, params
+
+    def query(
+        self,
+        taxon_key: int,
+        bbox: tuple[float, float, float, float],
+        limit: Optional[int] = None,
+    ) -> list[tuple[float, float]]:
+        """Stored (longitude, latitude) pairs inside bbox, in fetch order."""
+        where, params = self._bbox_filter(taxon_key, bbox)
+        sql = f"SELECT lon, lat FROM occurrences {where} ORDER BY rowid"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            return [tuple(row) for row in conn.execute(sql, params)]
+
+    def count(self, taxon_key: int, bbox: tuple[float, float, float, float]) -> int:
+        """Number of stored records inside bbox."""
+        where, params = self._bbox_filter(taxon_key, bbox)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM occurrences {where}", params).fetchone()[0]
+
+    def _insert(self, conn: sqlite3.Connection, taxon_key: int, records: list[tuple[int, float, float]]) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO occurrences VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (taxon_key, gbif_id, lon, lat, self._cell(lon), self._cell(lat))
+                for gbif_id, lon, lat in records
+            ],
+        )
+
+    @staticmethod
+    def _insert_coverage(
+        conn: sqlite3.Connection,
+        taxon_key: int,
+        bbox: tuple[float, float, float, float],
+        n_records: int,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (taxon_key, *bbox, fetched_at or time.time(), n_records),
+        )
+
+    def upsert(self, taxon_key: int, records: list[tuple[int, float, float]]) -> None:
+        """Insert or update (gbif_id, longitude, latitude) records."""
+        with self._connect() as conn:
+            self._insert(conn, taxon_key, records)
+
+    def replace(
+        self,
+        taxon_key: int,
+        bbox: tuple[float, float, float, float],
+        records: list[tuple[int, float, float]],
+    ) -> None:
+        """
+        Replace all stored records inside bbox with a complete fetch and record the coverage.
+
+        Both happen in one transaction, so the records and their coverage
+        are never out of step.
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        with self._connect() as conn:
+            conn.execute(
+                """
+                DELETE FROM occurrences
+                WHERE taxon_key = ? AND lon BETWEEN ? AND ? AND lat BETWEEN ? AND ?
+                """,
+                (taxon_key, min_lon, max_lon, min_lat, max_lat),
+            )
+            self._insert(conn, taxon_key, records)
+            self._insert_coverage(conn, taxon_key, bbox, len(records))
+
+    def record_coverage(
+        self,
+        taxon_key: int,
+        bbox: tuple[float, float, float, float],
+        n_records: int,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """Mark bbox as completely fetched (now, unless fetched_at is given)."""
+        with self._connect() as conn:
+            self._insert_coverage(conn, taxon_key, bbox, n_records, fetched_at)
+
+
+class NameCache(_SqliteStore):
+    """
+    Persistent species name -> GBIF match info (as returned by
+    get_species_info). Only confident matches should be put here.
+    """
+
+    _schema = _NAME_SCHEMA
+
+    def get(self, name: str) -> Optional[dict]:
+        """Cached match info for name, if any."""
+        return self.get_many([name]).get(name)
+
+    def get_many(self, names: list[str]) -> dict[str, dict]:
+        """Cached match info for the names that have it."""
+        found = {}
+        with self._connect() as conn:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(names), 500):
+                chunk = names[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT name, info FROM species_names WHERE name IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                found.update((name, json.loads(info)) for name, info in rows)
+        return found
+
+    def put(self, name: str, info: dict) -> None:
+        """Cache match info for name."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO species_names VALUES (?, ?, ?)",
+                (name, json.dumps(info), time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM species_names").fetchone()[0]
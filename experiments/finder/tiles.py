@@ -0,0 +1,203 @@
+"""
+XYZ heatmap tiles rendered from probability maps.
+
+The score array is reduced into a pyramid by 2x2 block means, and each
+Web Mercator tile samples the pyramid level closest to its resolution. The
+output is static, so a map can show a whole-region prediction with no
+per-request compute.
+"""
+
+import json
+import logging
+import math
+import struct
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import rasterio
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256
+
+# Rows of the score array reduced per block when building the pyramid, so a
+# memory-mapped score map is never read in full
+_DOWNSAMPLE_BLOCK_ROWS = 2048
+
+# Fixed colormap: (score, RGBA) stops, linearly interpolated. Low scores fade
+# out so the basemap stays visible.
+COLORMAP_STOPS = (
+    (0.0, (68, 1, 84, 0)),
+    (0.25, (59, 82, 139, 64)),
+    (0.5, (33, 145, 140, 150)),
+    (0.75, (94, 201, 98, 200)),
+    (1.0, (253, 231, 37, 235)),
+)
+
+
+def _colormap_lut() -> np.ndarray:
+    """(256, 4) uint8 RGBA lookup table for scores quantized to 0-255."""
+    positions = np.linspace(0, 1, 256)
+    stops = np.array([s for s, _ in COLORMAP_STOPS])
+    colors = np.array([c for _, c in COLORMAP_STOPS], dtype=np.float64)
+    lut = np.stack([np.interp(positions, stops, colors[:, i]) for i in range(4)], axis=1)
+    return np.rint(lut).astype(np.uint8)
+
+
+def _encode_png(rgba: np.ndarray) -> bytes:
+    """Encode an (H, W, 4) uint8 array as an RGBA PNG."""
+    height, width, _ = rgba.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # Every scanline starts with filter type 0 (none)
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ])
+
+
+def _downsample(level: np.ndarray) -> np.ndarray:
+    """
+    Halve a level by 2x2 block means, quantized to 0-255.
+
+    Odd edges are padded by repeating the last row/column. The level is
+    read in row blocks, so it may be a memmap.
+    """
+    height, width = level.shape
+    out = np.empty(((height + 1) // 2, (width + 1) // 2), dtype=np.uint8)
+    scale = 255 if level.dtype != np.uint8 else 1
+
+    for start in range(0, height, _DOWNSAMPLE_BLOCK_ROWS):
+        block = np.asarray(level[start:start + _DOWNSAMPLE_BLOCK_ROWS], dtype=np.float32)
+        block = np.pad(block, ((0, block.shape[0] % 2), (0, width % 2)), mode="edge")
+        means = block.reshape(block.shape[0] // 2, 2, -1, 2).mean(axis=(1, 3))
+        out[start // 2:start // 2 + len(means)] = np.rint(means * scale)
+    return out
+
+
+def _lat_to_tile_y(lat: float, zoom: int) -> float:
+    lat = math.radians(max(min(lat, 85.0511), -85.0511))
+    return (1 - math.asinh(math.tan(lat)) / math.pi) / 2 * (1 << zoom)
+
+
+def _lon_to_tile_x(lon: float, zoom: int) -> float:
+    return (lon + 180) / 360 * (1 << zoom)
+
+
+def _default_zooms(
+    transform: rasterio.transform.Affine, height: int, width: int
+) -> tuple[int, int]:
+    """Zoom at which the whole map fits in about one tile, and the native-resolution zoom."""
+    pixel_deg = abs(transform.a)
+    extent_deg = max(width * pixel_deg, height * abs(transform.e))
+    max_zoom = math.ceil(math.log2(360 / (TILE_SIZE * pixel_deg)))
+    min_zoom = max(0, math.floor(math.log2(360 / extent_deg)))
+    return min(min_zoom, max_zoom), max_zoom
+
+
+def write_tiles(
+    scores: np.ndarray,
+    transform: rasterio.transform.Affine,
+    output_dir: Path,
+    min_zoom: Optional[int] = None,
+    max_zoom: Optional[int] = None,
+) -> int:
+    """
+    Render a probability map as a {z}/{x}/{y}.png heatmap tile pyramid.
+
+    Tiles that would be fully transparent are not written. A tiles.json
+    (TileJSON) next to the pyramid records the zoom range and bounds.
+
+    Args:
+        scores: (H, W) probabilities in [0, 1] on a north-up EPSG:4326 grid
+            (may be a memmap)
+        transform: Affine transform of the score grid
+        output_dir: Directory for the pyramid
+        min_zoom: Lowest zoom (default: the map fits in about one tile)
+        max_zoom: Highest zoom (default: tiles at the map's native resolution)
+
+    Returns:
+        Number of tiles written
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    height, width = scores.shape
+    default_min, default_max = _default_zooms(transform, height, width)
+    min_zoom = default_min if min_zoom is None else min_zoom
+    max_zoom = default_max if max_zoom is None else max_zoom
+
+    west, north = transform.c, transform.f
+    east, south = transform * (width, height)
+    pixel_w, pixel_h = abs(transform.a), abs(transform.e)
+
+    # levels[i] is the score map reduced 2**i times
+    n_levels = max(1, math.floor(math.log2(360 / (TILE_SIZE * pixel_w * (1 << min_zoom)))) + 1)
+    levels = [scores]
+    while len(levels) < n_levels and min(levels[-1].shape) > 1:
+        levels.append(_downsample(levels[-1]))
+
+    lut = _colormap_lut()
+    n_tiles = 0
+    for zoom in range(min_zoom, max_zoom + 1):
+        world_px = TILE_SIZE * (1 << zoom)
+        tile_px_deg = 360 / world_px
+
+        # Coarsest level that is still at least as fine as the tile pixels
+        index = min(len(levels) - 1, max(0, math.floor(math.log2(tile_px_deg / pixel_w))))
+        level = levels[index]
+        level_h, level_w = level.shape
+        level_px_w, level_px_h = pixel_w * (1 << index), pixel_h * (1 << index)
+
+        x_range = range(int(_lon_to_tile_x(west, zoom)), math.ceil(_lon_to_tile_x(east, zoom)))
+        y_range = range(int(_lat_to_tile_y(north, zoom)), math.ceil(_lat_to_tile_y(south, zoom)))
+
+        for tx in x_range:
+            # Web Mercator is linear in longitude, and in latitude per row, so
+            # each tile samples a separable grid of level rows and columns
+            lons = (tx * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) / world_px * 360 - 180
+            cols = np.floor((lons - west) / level_px_w).astype(np.int64)
+            col_ok = (cols >= 0) & (cols < level_w)
+            if not col_ok.any():
+                continue
+
+            for ty in y_range:
+                mercator_y = (ty * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) / world_px
+                lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * mercator_y))))
+                rows = np.floor((north - lats) / level_px_h).astype(np.int64)
+                row_ok = (rows >= 0) & (rows < level_h)
+                if not row_ok.any():
+                    continue
+
+                sampled = np.asarray(level[np.ix_(rows[row_ok], cols[col_ok])])
+                if sampled.dtype != np.uint8:
+                    sampled = np.rint(np.clip(sampled, 0, 1) * 255).astype(np.uint8)
+
+                rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+                rgba[np.ix_(row_ok, col_ok)] = lut[sampled]
+                if not rgba[..., 3].any():
+                    continue
+
+                path = output_dir / str(zoom) / str(tx) / f"{ty}.png"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(_encode_png(rgba))
+                n_tiles += 1
+
+    with open(output_dir / "tiles.json", "w") as f:
+        json.dump({
+            "tilejson": "3.0.0",
+            "tiles": ["{z}/{x}/{y}.png"],
+            "minzoom": min_zoom,
+            "maxzoom": max_zoom,
+            "bounds": [west, south, east, north],
+        }, f, indent=2)
+
+    logger.info(f"Saved {n_tiles} heatmap tiles (zoom {min_zoom}-{max_zoom}): {output_dir}")
+    return n_tiles
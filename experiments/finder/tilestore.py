@@ -0,0 +1,163 @@
+"""
+Consolidated tile store: a year of embedding tiles packed into single arrays.
+
+The grid_*/ layout costs two file opens and two .npy header parses per
+0.1° tile, and a regional read hops across thousands of small files. The
+store keeps every tile as one chunk of a single memory-mappable int8 array
+(with a matching float32 scales array), placed on a regular grid:
+
+    store/
+        data.npy     (n_chunks, tile_h, tile_w, C) int8, zero-padded
+        scales.npy   (n_chunks, tile_h, tile_w) float32
+        index.npy    (grid_rows, grid_cols) int32 chunk id, -1 if absent
+        store.json   grid origin, tile size and each chunk's true shape
+
+Chunks are ordered north to south, then west to east, so the tiles of a
+region are read in long sequential runs. Build it with pack_tiles.py.
+"""
+
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .catalog import TileCatalog, tile_keys
+
+logger = logging.getLogger(__name__)
+
+STORE_NAME = "store"
+STORE_VERSION = 1
+
+
+class TileStore:
+    """
+    Read access to a consolidated tile store.
+
+    Tiles are keyed (lon, lat) as named in the grid_*/ layout; tile()
+    returns views of the shared memory maps, so opening a region costs
+    nothing per tile.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / "store.json") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported tile store version {meta.get('version')}: {self.path}")
+
+        self.tile_size: float = meta["tile_size"]
+        self.origin: tuple[float, float] = tuple(meta["origin"])
+        self._shapes = np.asarray(meta["tile_shapes"], dtype=np.int64).reshape(-1, 2)
+        self._data = np.load(self.path / "data.npy", mmap_mode="r")
+        self._scales = np.load(self.path / "scales.npy", mmap_mode="r")
+        self._index = np.load(self.path / "index.npy")
+
+    def __len__(self) -> int:
+        return len(self._shapes)
+
+    @property
+    def n_channels(self) -> int:
+        return self._data.shape[-1]
+
+    @classmethod
+    def find(cls, tile_dir: Path, tile_size: float) -> Optional["TileStore"]:
+        """The store in tile_dir, or None if there is none for this tile size."""
+        path = Path(tile_dir) / STORE_NAME
+        if not (path / "store.json").exists():
+            return None
+        store = cls(path)
+        if not np.isclose(store.tile_size, tile_size):
+            logger.warning(f"Ignoring {path}: built for {store.tile_size}° tiles, not {tile_size}°")
+            return None
+        return store
+
+    def chunk(self, lon: float, lat: float) -> Optional[int]:
+        """Chunk id of the tile keyed (lon, lat), or None if it is not stored."""
+        origin_lon, origin_lat = self.origin
+        row = round((origin_lat - lat) / self.tile_size)
+        col = round((lon - origin_lon) / self.tile_size)
+        if not (0 <= row < self._index.shape[0] and 0 <= col < self._index.shape[1]):
+            return None
+        chunk = int(self._index[row, col])
+        return chunk if chunk >= 0 else None
+
+    def query(self, bbox: tuple[float, float, float, float]) -> dict[tuple[float, float], int]:
+        """Chunk ids of the stored tiles that may cover bbox, keyed (lon, lat)."""
+        chunks = {}
+        for key in tile_keys(bbox, self.tile_size):
+            chunk = self.chunk(*key)
+            if chunk is not None:
+                chunks[key] = chunk
+        return chunks
+
+    def tile(self, chunk: int) -> tuple[np.ndarray, np.ndarray]:
+        """Read-only (H, W, C) data and (H, W) scales views of one chunk, at the tile's true shape."""
+        h, w = self._shapes[chunk]
+        return self._data[chunk, :h, :w], self._scales[chunk, :h, :w]
+
+    @classmethod
+    def build(cls, catalog: TileCatalog, path: Optional[Path] = None) -> "TileStore":
+        """
+        Pack the tiles of a catalog into a store (default: store/ in the tile directory).
+
+        Tiles are copied one at a time into memory-mapped outputs, so memory
+        stays at about one tile. The store is written next to path and moved
+        into place when complete.
+        """
+        path = Path(path) if path else catalog.tile_dir / STORE_NAME
+        entries = sorted(catalog.entries(), key=lambda e: (-e.lat, e.lon))
+        if not entries:
+            raise ValueError(f"No tiles to pack in {catalog.tile_dir}")
+
+        n_channels = {e.n_channels for e in entries}
+        dtypes = {np.dtype(e.dtype) for e in entries}
+        if len(n_channels) != 1 or dtypes != {np.dtype(np.int8)}:
+            raise ValueError(f"Tiles must share one channel count and be int8, got {n_channels} / {dtypes}")
+        tile_h = max(e.shape[0] for e in entries)
+        tile_w = max(e.shape[1] for e in entries)
+
+        # Regular grid over the extent of the tiles, origin at the north-west tile
+        step = catalog.tile_size
+        origin_lon = min(e.lon for e in entries)
+        origin_lat = max(e.lat for e in entries)
+        rows = [round((origin_lat - e.lat) / step) for e in entries]
+        cols = [round((e.lon - origin_lon) / step) for e in entries]
+        index = np.full((max(rows) + 1, max(cols) + 1), -1, dtype=np.int32)
+        index[rows, cols] = np.arange(len(entries), dtype=np.int32)
+
+        partial = path.with_name(f".{path.name}.partial")
+        shutil.rmtree(partial, ignore_errors=True)
+        partial.mkdir(parents=True)
+
+        data = np.lib.format.open_memmap(
+            partial / "data.npy", mode="w+", dtype=np.int8,
+            shape=(len(entries), tile_h, tile_w, n_channels.pop()),
+        )
+        scales = np.lib.format.open_memmap(
+            partial / "scales.npy", mode="w+", dtype=np.float32,
+            shape=(len(entries), tile_h, tile_w),
+        )
+        for chunk, entry in enumerate(entries):
+            tile_data, tile_scales = catalog.open(entry)
+            h, w = tile_data.shape[:2]
+            data[chunk, :h, :w] = tile_data
+            scales[chunk, :h, :w] = tile_scales
+        data.flush()
+        scales.flush()
+        del data, scales
+
+        np.save(partial / "index.npy", index)
+        with open(partial / "store.json", "w") as f:
+            json.dump({
+                "version": STORE_VERSION,
+                "tile_size": step,
+                "origin": [origin_lon, origin_lat],
+                "tile_shapes": [list(e.shape[:2]) for e in entries],
+            }, f)
+
+        shutil.rmtree(path, ignore_errors=True)
+        partial.rename(path)
+        return cls(path)
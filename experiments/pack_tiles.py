@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Pack a year of grid_*/ embedding tiles into a consolidated tile store.
+
+Writes cache/{year}/store/: one int8 data array and one scales array with a
+chunk per tile on a regular grid, which EmbeddingMosaic then reads instead
+of the individual tile files. Tiles are listed from cache/{year}/catalog.json
+if it exists (see scan_tiles.py), otherwise by scanning the directory. Rerun
+after downloading tiles.
+
+Usage:
+    uv run python pack_tiles.py
+    uv run python pack_tiles.py --year 2024 --cache-dir /data/tessera
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+from finder.catalog import TileCatalog
+from finder.tilestore import TileStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent
+CACHE_DIR = PROJECT_ROOT / "cache"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack embedding tiles into a consolidated tile store")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR), help="Directory containing year subdirectories")
+    parser.add_argument("--year", type=int, default=2024, help="Year of embeddings (default: 2024)")
+    parser.add_argument("--tile-size", type=float, default=0.1, help="Tile size in degrees (default: 0.1)")
+    parser.add_argument("-o", "--output", help="Store directory (default: {cache-dir}/{year}/store)")
+    args = parser.parse_args()
+
+    tile_dir = Path(args.cache_dir) / str(args.year)
+    if not tile_dir.is_dir():
+        parser.error(f"No tile directory: {tile_dir}")
+
+    start = time.time()
+    catalog = TileCatalog.find(tile_dir, args.tile_size)
+    if catalog is None:
+        logger.info(f"No tile catalog, scanning {tile_dir}")
+        catalog = TileCatalog.scan(tile_dir, tile_size=args.tile_size)
+
+    store = TileStore.build(catalog, Path(args.output) if args.output else None)
+    logger.info(f"Packed {len(store)} tiles in {time.time() - start:.1f}s: {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,36 @@
 Predict habitat suitability for a species in a local area around a point.
 
 Uses pre-trained classifier models for fast predictions.
-Only loads the single tile containing the point (not the full mosaic).
+Only reads the window around the point from the memory-mapped tile(s) it
+overlaps (not the full mosaic).
 
 Supports two model types:
 1. logistic - Logistic Regression (fast, no uncertainty)
 2. mlp - MLP with MC Dropout (provides uncertainty estimates)
+
+Can also run as a long-lived worker (--serve) that keeps imports, models
+and tiles resident and answers many requests over local HTTP.
 """
 
 import argparse
 import json
+import logging
+import signal
 import sys
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional, Union
+from urllib.parse import parse_qs, urlparse
 
 import numpy as np
 import rasterio
 
+from finder.catalog import TileCatalog, tile_keys, tile_name
 from finder.methods import ClassifierMethod, MLPClassifierMethod
+from finder.model_cache import ModelCache
+from finder.tilestore import TileStore
 
 PROJECT_ROOT = Path(__file__).parent
 CACHE_DIR = PROJECT_ROOT / "cache"
@@ -28,8 +41,17 @@ MODELS_DIR = PROJECT_ROOT / "models"
 YEAR = 2024
 TILE_SIZE = 0.1  # degrees
 
+# Resident cache sizes for the long-lived worker
+MODEL_CACHE_SIZE = 32
+TILE_CACHE_SIZE = 64  # open tile memory maps; only the windows read are paged in
+
 ModelType = Literal["logistic", "mlp"]
 
+logger = logging.getLogger(__name__)
+
+# Loaded classifiers keyed by (species_key, model_type)
+MODEL_CACHE = ModelCache(max_entries=MODEL_CACHE_SIZE)
+
 
 def meters_to_degrees(meters: float, lat: float) -> tuple[float, float]:
     """Convert meters to approximate degrees at a given latitude."""
@@ -48,28 +70,115 @@ def get_tile_coords(lon: float, lat: float) -> tuple[float, float]:
     return round(tile_lon, 2), round(tile_lat, 2)
 
 
-def load_single_tile(tile_lon: float, tile_lat: float) -> tuple[np.ndarray, rasterio.Affine] | None:
-    """Load a single embedding tile. Returns (embeddings, transform) or None."""
-    tile_dir = CACHE_DIR / str(YEAR)
-    name = f"grid_{tile_lon:.2f}_{tile_lat:.2f}"
-    npy_path = tile_dir / name / f"{name}.npy"
-    scales_path = tile_dir / name / f"{name}_scales.npy"
-
-    if not npy_path.exists() or not scales_path.exists():
-        return None
-
-    # Load and dequantize
-    data = np.load(npy_path).astype(np.float32)
-    scales = np.load(scales_path)
-    embeddings = data * scales[:, :, np.newaxis]
+@lru_cache(maxsize=1)
+def get_tile_store() -> Optional[TileStore]:
+    """Consolidated tile store of the embeddings year, if one has been built with pack_tiles.py."""
+    return TileStore.find(CACHE_DIR / str(YEAR), TILE_SIZE)
+
+
+@lru_cache(maxsize=1)
+def get_tile_catalog() -> Optional[TileCatalog]:
+    """Tile catalog of the embeddings year, if one has been built with scan_tiles.py."""
+    return TileCatalog.find(CACHE_DIR / str(YEAR), TILE_SIZE)
+
+
+@lru_cache(maxsize=TILE_CACHE_SIZE)
+def open_tile(tile_lon: float, tile_lat: float) -> tuple[np.ndarray, np.ndarray, rasterio.Affine] | None:
+    """Memory-map a single embedding tile. Returns (data, scales, transform) or None."""
+    store = get_tile_store()
+    catalog = get_tile_catalog() if store is None else None
+    if store is not None:
+        chunk = store.chunk(tile_lon, tile_lat)
+        if chunk is None:
+            return None
+        data, scales = store.tile(chunk)
+    elif catalog is not None:
+        # The catalog knows which tiles exist; no filesystem probing
+        entry = catalog.get(tile_lon, tile_lat)
+        if entry is None:
+            return None
+        data, scales = catalog.open(entry)
+    else:
+        tile_dir = CACHE_DIR / str(YEAR)
+        name = tile_name(tile_lon, tile_lat)
+        npy_path = tile_dir / name / f"{name}.npy"
+        scales_path = tile_dir / name / f"{name}_scales.npy"
+
+        if not npy_path.exists() or not scales_path.exists():
+            return None
+        data, scales = np.load(npy_path, mmap_mode="r"), np.load(scales_path, mmap_mode="r")
 
     # Create transform for this tile
-    h, w = embeddings.shape[:2]
+    h, w = data.shape[:2]
     transform = rasterio.transform.from_bounds(
         tile_lon, tile_lat, tile_lon + TILE_SIZE, tile_lat + TILE_SIZE, w, h
     )
 
-    return embeddings, transform
+    return data, scales, transform
+
+
+def read_window(
+    min_lon: float,
+    min_lat: float,
+    max_lon: float,
+    max_lat: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+    """
+    Dequantized embeddings and pixel-center coordinates of the non-empty pixels in a bbox.
+
+    Only the window's rows and columns are read and dequantized from each
+    tile it overlaps, so a window crossing a tile boundary is stitched from
+    the neighbouring tiles instead of being clipped.
+
+    Returns:
+        (embeddings (N, C), lons (N,), lats (N,)), or None if no tile
+        overlaps the bbox
+    """
+    parts = []
+    for tile_lon, tile_lat in tile_keys((min_lon, min_lat, max_lon, max_lat), TILE_SIZE):
+        tile = open_tile(tile_lon, tile_lat)
+        if tile is None:
+            continue
+        data, scales, transform = tile
+        h, w = data.shape[:2]
+
+        # Pixels of this tile within the bbox, corner pixels included
+        min_row, min_col = rasterio.transform.rowcol(transform, min_lon, max_lat)
+        max_row, max_col = rasterio.transform.rowcol(transform, max_lon, min_lat)
+        row0, row1 = max(min_row, 0), min(max_row, h - 1) + 1
+        col0, col1 = max(min_col, 0), min(max_col, w - 1) + 1
+        if row0 >= row1 or col0 >= col1:
+            continue
+
+        window = data[row0:row1, col0:col1] * scales[row0:row1, col0:col1, np.newaxis]
+        rows, cols = np.nonzero(np.any(window != 0, axis=-1))
+        px_lons, px_lats = rasterio.transform.xy(transform, rows + row0, cols + col0)
+        parts.append((window[rows, cols], np.atleast_1d(px_lons), np.atleast_1d(px_lats)))
+
+    if not parts:
+        return None
+    embeddings, lons, lats = zip(*parts)
+    return np.concatenate(embeddings), np.concatenate(lons), np.concatenate(lats)
+
+
+def load_classifier(
+    species_key: int,
+    model_type: ModelType,
+) -> Union[ClassifierMethod, MLPClassifierMethod]:
+    """Load the pre-trained classifier for a species, via the resident model cache."""
+    if model_type == "logistic":
+        model_path = MODELS_DIR / "logistic" / f"{species_key}.pkl"
+        if not model_path.exists():
+            # Fall back to old location for backward compatibility
+            model_path = MODELS_DIR / f"{species_key}.pkl"
+        if not model_path.exists():
+            raise ValueError(f"No logistic model for species key {species_key}. Run train_models.py first.")
+        return MODEL_CACHE.get((species_key, model_type), model_path, ClassifierMethod.load)
+
+    model_path = MODELS_DIR / "mlp" / f"{species_key}.pt"
+    if not model_path.exists():
+        raise ValueError(f"No MLP model for species key {species_key}. Run train_models.py --model-type mlp first.")
+    return MODEL_CACHE.get((species_key, model_type), model_path, MLPClassifierMethod.load)
 
 
 def predict_local(
@@ -82,7 +191,7 @@ def predict_local(
 ) -> dict:
     """
     Get predictions for a grid around a point using pre-trained model.
-    Only loads the single tile containing the point.
+    Only the grid's window is read, from whichever tiles it overlaps.
 
     Args:
         lat: Center latitude
@@ -96,27 +205,15 @@ def predict_local(
         Dictionary with predictions, each containing score and optionally uncertainty
     """
     # Load pre-trained classifier based on model type
-    if model_type == "logistic":
-        model_path = MODELS_DIR / "logistic" / f"{species_key}.pkl"
-        if not model_path.exists():
-            # Fall back to old location for backward compatibility
-            model_path = MODELS_DIR / f"{species_key}.pkl"
-        if not model_path.exists():
-            raise ValueError(f"No logistic model for species key {species_key}. Run train_models.py first.")
-        classifier = ClassifierMethod.load(model_path)
-        has_uncertainty = False
-    else:  # mlp
-        model_path = MODELS_DIR / "mlp" / f"{species_key}.pt"
-        if not model_path.exists():
-            raise ValueError(f"No MLP model for species key {species_key}. Run train_models.py --model-type mlp first.")
-        classifier = MLPClassifierMethod.load(model_path)
-        has_uncertainty = True
+    classifier = load_classifier(species_key, model_type)
+    has_uncertainty = model_type == "mlp"
 
-    # Find and load only the tile containing this point
-    tile_lon, tile_lat = get_tile_coords(lon, lat)
-    tile_data = load_single_tile(tile_lon, tile_lat)
+    # Calculate grid bounds in degrees
+    lon_offset, lat_offset = meters_to_degrees(grid_size_m / 2, lat)
+    window = read_window(lon - lon_offset, lat - lat_offset, lon + lon_offset, lat + lat_offset)
 
-    if tile_data is None:
+    if window is None:
+        tile_lon, tile_lat = get_tile_coords(lon, lat)
         return {
             "predictions": [],
             "species_key": species_key,
@@ -127,42 +224,12 @@ def predict_local(
             "error": f"No tile data at {tile_lon}, {tile_lat}",
         }
 
-    embeddings, transform = tile_data
-    h, w, _ = embeddings.shape
-
-    # Calculate grid bounds in degrees
-    lon_offset, lat_offset = meters_to_degrees(grid_size_m / 2, lat)
-    min_lon = lon - lon_offset
-    max_lon = lon + lon_offset
-    min_lat = lat - lat_offset
-    max_lat = lat + lat_offset
-
-    # Convert corner coordinates to pixel indices within this tile
-    min_row, min_col = rasterio.transform.rowcol(transform, min_lon, max_lat)
-    max_row, max_col = rasterio.transform.rowcol(transform, max_lon, min_lat)
-
-    # Clamp to valid range
-    min_row = max(0, min(min_row, h - 1))
-    max_row = max(0, min(max_row, h - 1))
-    min_col = max(0, min(min_col, w - 1))
-    max_col = max(0, min(max_col, w - 1))
-
-    # Collect embeddings and coordinates
-    embeddings_to_predict = []
-    coords_to_predict = []
-
-    for row in range(min_row, max_row + 1):
-        for col in range(min_col, max_col + 1):
-            emb = embeddings[row, col, :]
-            if not np.allclose(emb, 0):
-                px_lon, px_lat = rasterio.transform.xy(transform, row, col)
-                embeddings_to_predict.append(emb)
-                coords_to_predict.append((px_lon, px_lat))
+    embeddings_array, px_lons, px_lats = window
+    coords_to_predict = list(zip(px_lons.tolist(), px_lats.tolist()))
 
     # Batch predict
     predictions = []
-    if embeddings_to_predict:
-        embeddings_array = np.array(embeddings_to_predict)
+    if len(embeddings_array):
 
         if has_uncertainty:
             # MLP with MC Dropout - get both score and uncertainty
@@ -201,11 +268,141 @@ def predict_local(
     }
 
 
+class PredictionHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler for the prediction worker.
+
+    GET /predict?lat=&lon=&speciesKey=&gridSize=&modelType=&mcSamples=
+    GET /health
+    GET /stats
+    """
+
+    server: "PredictionServer"
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif url.path == "/stats":
+            self._send_json(200, {"model_cache": MODEL_CACHE.stats()})
+        elif url.path == "/predict":
+            self._handle_predict(parse_qs(url.query))
+        else:
+            self._send_json(404, {"error": f"Unknown path: {url.path}"})
+
+    def _handle_predict(self, query: dict[str, list[str]]) -> None:
+        def param(name: str, default: str | None = None) -> str | None:
+            return query.get(name, [default])[0]
+
+        try:
+            lat = float(param("lat"))
+            lon = float(param("lon"))
+            species_key = int(param("speciesKey"))
+            grid_size = int(param("gridSize", "100"))
+            model_type = param("modelType", "mlp")
+            mc_samples = int(param("mcSamples", "30"))
+        except (TypeError, ValueError):
+            self._send_json(400, {"error": "Missing or invalid parameters: lat, lon, speciesKey"})
+            return
+
+        if model_type not in ("logistic", "mlp"):
+            self._send_json(400, {"error": "Invalid modelType. Must be 'logistic' or 'mlp'"})
+            return
+
+        # Bound the number of predictions running at once; reject rather than queue forever
+        if not self.server.slots.acquire(timeout=self.server.queue_timeout):
+            self._send_json(503, {"error": "Prediction worker busy, try again"})
+            return
+        try:
+            result = predict_local(
+                lat=lat,
+                lon=lon,
+                species_key=species_key,
+                grid_size_m=grid_size,
+                model_type=model_type,
+                n_mc_samples=mc_samples,
+            )
+            self._send_json(200, result)
+        except ValueError as e:
+            self._send_json(404, {"error": str(e)})
+        except Exception as e:
+            logger.exception("Prediction failed")
+            self._send_json(500, {"error": str(e)})
+        finally:
+            self.server.slots.release()
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a concurrency limit on running predictions."""
+
+    # Let in-flight requests finish on shutdown instead of killing them
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        max_concurrency: int = 4,
+        queue_timeout: float = 30.0,
+    ):
+        super().__init__(address, PredictionHandler)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.queue_timeout = queue_timeout
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    max_concurrency: int = 4,
+    queue_timeout: float = 30.0,
+    model_cache_entries: int | None = MODEL_CACHE_SIZE,
+    model_cache_mb: float | None = None,
+) -> None:
+    """
+    Run the long-lived prediction worker until SIGINT/SIGTERM.
+
+    Imports, loaded models and tiles stay resident between requests, so
+    each click only pays for scoring the requested window.
+    """
+    MODEL_CACHE.resize(
+        max_entries=model_cache_entries,
+        max_bytes=int(model_cache_mb * 1024 * 1024) if model_cache_mb else None,
+    )
+    server = PredictionServer((host, port), max_concurrency, queue_timeout)
+
+    def shutdown(signum, frame):
+        logger.info("Shutting down prediction worker...")
+        # shutdown() blocks until serve_forever() returns, so call it off the main thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    logger.info(f"Prediction worker listening on http://{host}:{port} (max concurrency: {max_concurrency})")
+    try:
+        server.serve_forever()
+    finally:
+        # Waits for in-flight requests to complete
+        server.server_close()
+    logger.info("Prediction worker stopped")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Predict local habitat suitability")
-    parser.add_argument("--lat", type=float, required=True, help="Center latitude")
-    parser.add_argument("--lon", type=float, required=True, help="Center longitude")
-    parser.add_argument("--species-key", type=int, required=True, help="GBIF species key")
+    parser.add_argument("--lat", type=float, help="Center latitude")
+    parser.add_argument("--lon", type=float, help="Center longitude")
+    parser.add_argument("--species-key", type=int, help="GBIF species key")
     parser.add_argument("--grid-size", type=int, default=100, help="Grid size in meters")
     parser.add_argument(
         "--model-type",
@@ -220,9 +417,44 @@ def main():
         default=30,
         help="Number of MC Dropout samples for MLP (default: 30)",
     )
+    parser.add_argument("--serve", action="store_true", help="Run as a long-lived HTTP prediction worker")
+    parser.add_argument("--host", default="127.0.0.1", help="Worker bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Worker port (default: 8765)")
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=4,
+        help="Maximum predictions running at once in worker mode (default: 4)",
+    )
+    parser.add_argument(
+        "--model-cache-entries",
+        type=int,
+        default=MODEL_CACHE_SIZE,
+        help=f"Maximum resident models in worker mode (default: {MODEL_CACHE_SIZE})",
+    )
+    parser.add_argument(
+        "--model-cache-mb",
+        type=float,
+        default=None,
+        help="Maximum total size of resident models in MB (default: unbounded)",
+    )
 
     args = parser.parse_args()
 
+    if args.serve:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+        serve(
+            host=args.host,
+            port=args.port,
+            max_concurrency=args.max_concurrency,
+            model_cache_entries=args.model_cache_entries,
+            model_cache_mb=args.model_cache_mb,
+        )
+        return
+
+    if args.lat is None or args.lon is None or args.species_key is None:
+        parser.error("--lat, --lon and --species-key are required unless --serve is given")
+
     try:
         result = predict_local(
             lat=args.lat,
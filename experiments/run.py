@@ -8,6 +8,7 @@ computed from Tessera geospatial embeddings.
 Usage:
     uv run python run.py "Quercus robur" --region cambridge
     uv run python run.py "Species name" --bbox 0.0,52.0,1.0,53.0
+    uv run python run.py "Species name" --bbox -6,50,2,56 --max-memory 2G
 """
 
 import argparse
@@ -16,6 +17,8 @@ from pathlib import Path
 
 from finder import find_candidates
 from finder.pipeline import REGIONS
+from finder.store import NameCache, OccurrenceStore
+from finder.tiles import write_tiles
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +28,19 @@ logging.basicConfig(
 PROJECT_ROOT = Path(__file__).parent
 OUTPUT_DIR = PROJECT_ROOT / "output"
 CACHE_DIR = PROJECT_ROOT / "cache"
+GBIF_DB = CACHE_DIR / "gbif.sqlite"
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte size such as 512M, 2G or 1500000."""
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    value = value.strip().upper().removesuffix("B")
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size: {value}")
 
 
 def main():
@@ -35,6 +51,46 @@ def main():
     parser.add_argument("--region", choices=list(REGIONS.keys()), help="Predefined region")
     parser.add_argument("--bbox", help="Bounding box: min_lon,min_lat,max_lon,max_lat")
     parser.add_argument("-o", "--output", help="Output directory")
+    parser.add_argument(
+        "--storage",
+        choices=["dense", "quantized", "mmap"],
+        default="dense",
+        help="Mosaic storage: dense float32, quantized int8, or memory-mapped tiles (default: dense)",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=parse_size,
+        default=None,
+        help="Stream scoring in blocks within this budget (e.g. 2G); "
+             "memory-maps tiles and writes probability.tif window by window",
+    )
+    parser.add_argument(
+        "--cog",
+        action="store_true",
+        help="Write probability.tif as a cloud-optimized GeoTIFF (tiled, compressed, with overviews)",
+    )
+    parser.add_argument(
+        "--uint8",
+        action="store_true",
+        help="Also write probability_uint8.tif with scores quantized to 0-255",
+    )
+    parser.add_argument(
+        "--min-spacing",
+        type=float,
+        default=None,
+        metavar="METERS",
+        help="Keep candidates at least this far apart, preferring higher scores",
+    )
+    parser.add_argument(
+        "--tiles",
+        action="store_true",
+        help="Also render the probability map as XYZ heatmap tiles in tiles/{z}/{x}/{y}.png",
+    )
+    parser.add_argument(
+        "--no-store",
+        action="store_true",
+        help=f"Always query GBIF instead of the local store ({GBIF_DB.name})",
+    )
 
     args = parser.parse_args()
 
@@ -53,12 +109,25 @@ def main():
         bbox=bbox,
         cache_dir=CACHE_DIR,
         output_dir=output_dir,
+        storage=args.storage,
+        occurrence_store=None if args.no_store else OccurrenceStore(GBIF_DB),
+        name_cache=None if args.no_store else NameCache(GBIF_DB),
+        max_memory=args.max_memory,
+        raster_format="cog" if args.cog else "gtiff",
+        uint8=args.uint8,
+        min_spacing_m=args.min_spacing,
     )
+    if args.tiles:
+        n_tiles = write_tiles(result.scores, result.transform, output_dir / "tiles")
 
     print(f"\nOutput: {output_dir}/")
     print(f"  - probability.tif")
-    print(f"  - candidates.geojson ({result.to_geojson()['metadata']['n_candidates']} points)")
+    if args.uint8:
+        print(f"  - probability_uint8.tif")
+    print(f"  - candidates.geojson ({result.n_candidates} points)")
     print(f"  - occurrences.geojson ({result.n_occurrences} GBIF records)")
+    if args.tiles:
+        print(f"  - tiles/ ({n_tiles} heatmap tiles)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Build the tile catalog for a year of embedding tiles.
+
+Scans cache/{year}/grid_*/ once and writes cache/{year}/catalog.json, which
+EmbeddingMosaic and predict_local.py then use instead of probing the
+filesystem for every candidate tile. Rerun after downloading tiles; tiles
+added later are not seen until the catalog is rebuilt.
+
+Usage:
+    uv run python scan_tiles.py
+    uv run python scan_tiles.py --year 2024 --cache-dir /data/tessera
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+from finder.catalog import TileCatalog
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent
+CACHE_DIR = PROJECT_ROOT / "cache"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index embedding tiles into a catalog file")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR), help="Directory containing year subdirectories")
+    parser.add_argument("--year", type=int, default=2024, help="Year of embeddings (default: 2024)")
+    parser.add_argument("--tile-size", type=float, default=0.1, help="Tile size in degrees (default: 0.1)")
+    args = parser.parse_args()
+
+    tile_dir = Path(args.cache_dir) / str(args.year)
+    if not tile_dir.is_dir():
+        parser.error(f"No tile directory: {tile_dir}")
+
+    start = time.time()
+    catalog = TileCatalog.scan(tile_dir, tile_size=args.tile_size)
+    path = catalog.save()
+    logger.info(f"Indexed {len(catalog)} tiles in {time.time() - start:.1f}s: {path}")
+
+
+if __name__ == "__main__":
+    main()
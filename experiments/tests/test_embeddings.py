@@ -0,0 +1,85 @@
+"""Tests that every mosaic storage mode reads the same embeddings."""
+
+import numpy as np
+import pytest
+
+from finder.catalog import tile_name
+from finder.embeddings import EmbeddingMosaic
+
+BBOX = (0.0, 52.0, 0.2, 52.2)
+TILE_H, TILE_W, N_CHANNELS = 12, 10, 4
+
+
+@pytest.fixture(scope="module")
+def cache_dir(tmp_path_factory):
+    """Tile cache for BBOX: a 2 x 2 grid of tiles with the south-east one missing."""
+    root = tmp_path_factory.mktemp("cache")
+    rng = np.random.default_rng(0)
+    for lon, lat in [(0.05, 52.05), (0.05, 52.15), (0.15, 52.15)]:
+        name = tile_name(lon, lat)
+        tile_dir = root / "2024" / name
+        tile_dir.mkdir(parents=True)
+        data = rng.integers(-127, 128, size=(TILE_H, TILE_W, N_CHANNELS), dtype=np.int8)
+        scales = rng.uniform(0.01, 0.05, size=(TILE_H, TILE_W)).astype(np.float32)
+        np.save(tile_dir / f"{name}.npy", data)
+        np.save(tile_dir / f"{name}_scales.npy", scales)
+    return root
+
+
+@pytest.fixture(scope="module")
+def mosaics(cache_dir):
+    mosaics = {}
+    for storage in ("dense", "quantized", "mmap"):
+        mosaics[storage] = EmbeddingMosaic(cache_dir, BBOX, storage=storage)
+        mosaics[storage].load()
+    return mosaics
+
+
+# Keys for an axis of the given size
+KEYS = {
+    "int": lambda size: 3,
+    "negative int": lambda size: -2,
+    "slice": lambda size: slice(5, 20),
+    "stepped slice": lambda size: slice(1, None, 3),
+    "bool mask": lambda size: np.arange(size) % 3 == 0,
+    "int array": lambda size: np.array([0, 7, size - 1, 7, -1]),
+    "2d int array": lambda size: np.array([[0, 1], [size - 2, 5]]),
+}
+
+
+@pytest.mark.parametrize("name", KEYS)
+def test_storage_modes_agree(mosaics, name):
+    dense = mosaics["dense"].mosaic
+    h, w, _ = dense.shape
+    row_key, col_key = KEYS[name](h), KEYS[name](w)
+    for storage in ("quantized", "mmap"):
+        lazy = mosaics[storage].mosaic
+        for key in [
+            (row_key,),
+            (row_key, slice(None)),
+            (row_key, slice(2, 9)),
+            (slice(None), col_key),
+            (slice(4, 15), col_key),
+            (row_key, slice(1, 8), 2),
+        ]:
+            got, expected = lazy[key], dense[key]
+            assert got.shape == expected.shape, (storage, key)
+            np.testing.assert_array_equal(got, expected)
+
+
+def test_int_arrays_as_pixels(mosaics):
+    rows, cols = np.array([0, 13, 23, 5]), np.array([19, 2, 15, 5])
+    expected = mosaics["dense"].mosaic[rows, cols]
+    for storage in ("quantized", "mmap"):
+        np.testing.assert_array_equal(mosaics[storage].mosaic[rows, cols], expected)
+
+
+def test_valid_indices_without_index(cache_dir, mosaics):
+    unindexed = EmbeddingMosaic(cache_dir, BBOX, storage="mmap", index_valid=False)
+    unindexed.load()
+    valid = mosaics["dense"].valid_indices
+    ranks = np.random.default_rng(0).permutation(len(valid))
+
+    assert unindexed.n_valid == len(valid)
+    np.testing.assert_array_equal(unindexed.valid_indices_at(ranks), valid[ranks])
+    assert unindexed._valid_indices is None
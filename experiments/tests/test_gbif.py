@@ -0,0 +1,50 @@
+"""Tests for paging through the GBIF occurrence search API."""
+
+import pytest
+import requests
+
+from finder import gbif
+
+BBOX = (0.0, 52.0, 1.0, 53.0)
+
+
+def fake_search(count: int):
+    """Stand-in for gbif._get serving count records, with the search API's paging cap."""
+    requests_seen = []
+
+    def get(path: str, params: dict) -> dict:
+        offset, limit = params["offset"], params["limit"]
+        requests_seen.append((offset, limit))
+        if offset + limit > gbif.MAX_SEARCH_RECORDS:
+            raise requests.HTTPError(f"offset+limit {offset + limit} > {gbif.MAX_SEARCH_RECORDS}")
+        keys = range(offset, min(offset + limit, count))
+        return {
+            "count": count,
+            "results": [{"key": key, "decimalLongitude": 0.5, "decimalLatitude": 52.5} for key in keys],
+        }
+
+    return get, requests_seen
+
+
+def test_fetch_stops_at_search_cap(monkeypatch):
+    get, requests_seen = fake_search(gbif.MAX_SEARCH_RECORDS + 50_000)
+    monkeypatch.setattr(gbif, "_get", get)
+
+    records, complete = gbif._fetch_occurrence_records(1, BBOX)
+
+    assert not complete
+    assert [key for key, _, _ in records] == list(range(gbif.MAX_SEARCH_RECORDS))
+    assert max(offset + limit for offset, limit in requests_seen) == gbif.MAX_SEARCH_RECORDS
+
+
+@pytest.mark.parametrize("count, limit", [(1000, None), (1000, 650), (250, None)])
+def test_fetch_pages_to_total(monkeypatch, count, limit):
+    get, requests_seen = fake_search(count)
+    monkeypatch.setattr(gbif, "_get", get)
+
+    records, complete = gbif._fetch_occurrence_records(1, BBOX, limit=limit)
+
+    total = min(count, limit or count)
+    assert [key for key, _, _ in records] == list(range(total))
+    assert complete == (total == count)
+    assert all(offset + limit <= max(total, gbif.PAGE_SIZE) for offset, limit in requests_seen)
@@ -9,24 +9,37 @@ Supports two model types:
 Models are saved to separate directories for comparison:
 - models/logistic/{taxon_key}.pkl
 - models/mlp/{taxon_key}.pt
+
+With --workers N, GBIF fetches run concurrently on a thread pool while
+fitting runs on N worker processes, each limited to a few torch/BLAS
+threads so workers do not oversubscribe the cores.
 """
 
 import argparse
 import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional
 
 import numpy as np
+import torch
+from threadpoolctl import threadpool_limits
 
-from finder import get_species_info, fetch_occurrences, EmbeddingMosaic
+from finder import get_species_info, resolve_species, fetch_occurrences, EmbeddingMosaic
 from finder.methods import ClassifierMethod, MLPClassifierMethod
 from finder.pipeline import REGIONS, sample_background
+from finder.store import NameCache, OccurrenceStore
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
 
 PROJECT_ROOT = Path(__file__).parent
 CACHE_DIR = PROJECT_ROOT / "cache"
+GBIF_DB = CACHE_DIR / "gbif.sqlite"
+OCCURRENCE_STORE = OccurrenceStore(GBIF_DB)
+NAME_CACHE = NameCache(GBIF_DB)
 MODELS_DIR = PROJECT_ROOT / "models"
 
 # Same species list as experiment.py
@@ -46,6 +59,89 @@ SEED = 42
 ModelType = Literal["logistic", "mlp", "both"]
 
 
+def prepare_training_data(
+    species_name: str,
+    mosaic: EmbeddingMosaic,
+) -> Optional[tuple[int, np.ndarray, np.ndarray]]:
+    """
+    Fetch occurrences for a species and sample positive and background embeddings.
+
+    Returns:
+        (taxon_key, positive_embeddings, negative_embeddings), or None if the
+        species has too few occurrences
+    """
+    # Get species info
+    species_info = get_species_info(species_name, NAME_CACHE)
+    taxon_key = species_info["taxon_key"]
+    logger.info(f"  [{species_name}] Taxon key: {taxon_key}")
+
+    # Fetch occurrences
+    bbox = REGIONS[REGION]["bbox"]
+    occurrences = fetch_occurrences(taxon_key, bbox, store=OCCURRENCE_STORE)
+    logger.info(f"  [{species_name}] Occurrences: {len(occurrences)}")
+
+    if len(occurrences) < 5:
+        logger.info(f"  [{species_name}] Not enough occurrences, skipping")
+        return None
+
+    # Sample embeddings
+    positive_embeddings, valid_coords = mosaic.sample_at_coords(occurrences)
+    logger.info(f"  [{species_name}] Valid embeddings: {len(positive_embeddings)}")
+
+    if len(positive_embeddings) < 5:
+        logger.info(f"  [{species_name}] Not enough valid embeddings, skipping")
+        return None
+
+    # Sample background
+    n_background = len(positive_embeddings) * NEGATIVE_RATIO
+    negative_embeddings, _ = sample_background(
+        mosaic, n_background, valid_coords, seed=SEED
+    )
+    logger.info(f"  [{species_name}] Background samples: {len(negative_embeddings)}")
+
+    return taxon_key, positive_embeddings, negative_embeddings
+
+
+def fit_and_save(
+    species_name: str,
+    taxon_key: int,
+    positive_embeddings: np.ndarray,
+    negative_embeddings: np.ndarray,
+    model_type: ModelType = "both",
+    verbose: bool = True,
+) -> None:
+    """Train classifier(s) on sampled embeddings and save them."""
+    # Train and save Logistic Regression
+    if model_type in ("logistic", "both"):
+        logger.info(f"  [{species_name}] Training Logistic Regression...")
+        logistic_classifier = ClassifierMethod()
+        logistic_classifier.fit(positive_embeddings, negative_embeddings)
+
+        logistic_dir = MODELS_DIR / "logistic"
+        logistic_dir.mkdir(parents=True, exist_ok=True)
+        logistic_path = logistic_dir / f"{taxon_key}.pkl"
+        logistic_classifier.save(logistic_path)
+        logger.info(f"  [{species_name}] Saved: {logistic_path}")
+
+    # Train and save MLP with MC Dropout
+    if model_type in ("mlp", "both"):
+        logger.info(f"  [{species_name}] Training MLP with MC Dropout...")
+        mlp_classifier = MLPClassifierMethod(
+            hidden_dim=256,
+            dropout_rate=0.3,
+            learning_rate=1e-3,
+            n_epochs=100,
+            batch_size=64,
+        )
+        mlp_classifier.fit(positive_embeddings, negative_embeddings, verbose=verbose)
+
+        mlp_dir = MODELS_DIR / "mlp"
+        mlp_dir.mkdir(parents=True, exist_ok=True)
+        mlp_path = mlp_dir / f"{taxon_key}.pt"
+        mlp_classifier.save(mlp_path)
+        logger.info(f"  [{species_name}] Saved: {mlp_path}")
+
+
 def train_and_save_model(
     species_name: str,
     mosaic: EmbeddingMosaic,
@@ -57,65 +153,11 @@ def train_and_save_model(
     logger.info("=" * 60)
 
     try:
-        # Get species info
-        species_info = get_species_info(species_name)
-        taxon_key = species_info["taxon_key"]
-        logger.info(f"  Taxon key: {taxon_key}")
-
-        # Fetch occurrences
-        bbox = REGIONS[REGION]["bbox"]
-        occurrences = fetch_occurrences(taxon_key, bbox)
-        logger.info(f"  Occurrences: {len(occurrences)}")
-
-        if len(occurrences) < 5:
-            logger.info("  Not enough occurrences, skipping")
+        data = prepare_training_data(species_name, mosaic)
+        if data is None:
             return False
-
-        # Sample embeddings
-        positive_embeddings, valid_coords = mosaic.sample_at_coords(occurrences)
-        logger.info(f"  Valid embeddings: {len(positive_embeddings)}")
-
-        if len(positive_embeddings) < 5:
-            logger.info("  Not enough valid embeddings, skipping")
-            return False
-
-        # Sample background
-        n_background = len(positive_embeddings) * NEGATIVE_RATIO
-        negative_embeddings, _ = sample_background(
-            mosaic, n_background, valid_coords, seed=SEED
-        )
-        logger.info(f"  Background samples: {len(negative_embeddings)}")
-
-        # Train and save Logistic Regression
-        if model_type in ("logistic", "both"):
-            logger.info("  Training Logistic Regression...")
-            logistic_classifier = ClassifierMethod()
-            logistic_classifier.fit(positive_embeddings, negative_embeddings)
-
-            logistic_dir = MODELS_DIR / "logistic"
-            logistic_dir.mkdir(parents=True, exist_ok=True)
-            logistic_path = logistic_dir / f"{taxon_key}.pkl"
-            logistic_classifier.save(logistic_path)
-            logger.info(f"  Saved: {logistic_path}")
-
-        # Train and save MLP with MC Dropout
-        if model_type in ("mlp", "both"):
-            logger.info("  Training MLP with MC Dropout...")
-            mlp_classifier = MLPClassifierMethod(
-                hidden_dim=256,
-                dropout_rate=0.3,
-                learning_rate=1e-3,
-                n_epochs=100,
-                batch_size=64,
-            )
-            mlp_classifier.fit(positive_embeddings, negative_embeddings, verbose=True)
-
-            mlp_dir = MODELS_DIR / "mlp"
-            mlp_dir.mkdir(parents=True, exist_ok=True)
-            mlp_path = mlp_dir / f"{taxon_key}.pt"
-            mlp_classifier.save(mlp_path)
-            logger.info(f"  Saved: {mlp_path}")
-
+        taxon_key, positive_embeddings, negative_embeddings = data
+        fit_and_save(species_name, taxon_key, positive_embeddings, negative_embeddings, model_type)
         return True
 
     except Exception as e:
@@ -125,6 +167,101 @@ def train_and_save_model(
         return False
 
 
+def _init_fit_worker(n_threads: int) -> None:
+    """Process pool initializer: cap torch and BLAS threads for this worker."""
+    torch.set_num_threads(n_threads)
+    threadpool_limits(limits=n_threads)
+
+
+def _fit_and_save_in_worker(
+    species_name: str,
+    taxon_key: int,
+    positive_embeddings: np.ndarray,
+    negative_embeddings: np.ndarray,
+    model_type: ModelType,
+) -> bool:
+    # Progress bars from concurrent workers would interleave
+    fit_and_save(
+        species_name, taxon_key, positive_embeddings, negative_embeddings, model_type, verbose=False
+    )
+    return True
+
+
+def train_all_parallel(
+    species_list: list[str],
+    mosaic: EmbeddingMosaic,
+    model_type: ModelType = "both",
+    workers: int = 4,
+    fetch_workers: int = 8,
+    threads_per_worker: Optional[int] = None,
+) -> int:
+    """
+    Train models for many species concurrently.
+
+    GBIF fetching and sampling run on a thread pool; each species is handed
+    to a process pool for fitting as soon as its data is ready, so network
+    waits overlap with training. A failure only affects its own species.
+
+    Args:
+        species_list: Species names to train
+        mosaic: Loaded embedding mosaic
+        model_type: Model type(s) to train
+        workers: Number of fitting processes
+        fetch_workers: Number of concurrent GBIF fetches
+        threads_per_worker: torch/BLAS threads per fitting process
+            (default: CPU count divided by workers)
+
+    Returns:
+        Number of species whose models were saved
+    """
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(
+        f"Fitting on {workers} workers x {threads_per_worker} threads, "
+        f"{fetch_workers} concurrent fetches"
+    )
+
+    success_count = 0
+    # Spawn rather than fork: workers start while fetch threads are running
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_fit_worker,
+        initargs=(threads_per_worker,),
+    ) as fit_pool:
+        fetches = {
+            fetch_pool.submit(prepare_training_data, species, mosaic): species
+            for species in species_list
+        }
+        fits: dict[Future, str] = {}
+
+        for future in as_completed(fetches):
+            species = fetches[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                logger.error(f"  [{species}] Error preparing data: {e}")
+                continue
+            if data is None:
+                continue
+            taxon_key, positive_embeddings, negative_embeddings = data
+            fit_future = fit_pool.submit(
+                _fit_and_save_in_worker,
+                species, taxon_key, positive_embeddings, negative_embeddings, model_type,
+            )
+            fits[fit_future] = species
+
+        for future in as_completed(fits):
+            species = fits[future]
+            try:
+                if future.result():
+                    success_count += 1
+            except Exception as e:
+                logger.error(f"  [{species}] Error training: {e}")
+
+    return success_count
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Train classifier models for species habitat prediction"
@@ -136,6 +273,24 @@ def main():
         default="both",
         help="Type of model to train: logistic, mlp, or both (default: both)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Fitting processes; >1 trains species concurrently (default: 1, serial)",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=8,
+        help="Concurrent GBIF fetches when --workers > 1 (default: 8)",
+    )
+    parser.add_argument(
+        "--threads-per-worker",
+        type=int,
+        default=None,
+        help="torch/BLAS threads per fitting process (default: CPU count / workers)",
+    )
     args = parser.parse_args()
 
     model_type: ModelType = args.model_type
@@ -151,11 +306,24 @@ def main():
     mosaic.load()
     logger.info(f"Mosaic shape: {mosaic.shape}")
 
+    # Resolve all names up front; misses are looked up concurrently
+    resolve_species(SPECIES_LIST, NAME_CACHE, max_workers=args.fetch_workers)
+
     # Train models for each species
-    success_count = 0
-    for species in SPECIES_LIST:
-        if train_and_save_model(species, mosaic, model_type=model_type):
-            success_count += 1
+    if args.workers > 1:
+        success_count = train_all_parallel(
+            SPECIES_LIST,
+            mosaic,
+            model_type=model_type,
+            workers=args.workers,
+            fetch_workers=args.fetch_workers,
+            threads_per_worker=args.threads_per_worker,
+        )
+    else:
+        success_count = 0
+        for species in SPECIES_LIST:
+            if train_and_save_model(species, mosaic, model_type=model_type):
+                success_count += 1
 
     logger.info(f"\n{'='*60}")
     logger.info(f"COMPLETE: {success_count}/{len(SPECIES_LIST)} models saved")